@@ -0,0 +1,81 @@
+"""
+Асинхронная обертка над Database для Telegram ботов
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+from database import Database
+from item import Item
+
+
+class AsyncDatabase:
+    def __init__(self, db: Optional[Database] = None):
+        """
+        Неблокирующий доступ к базе из event loop
+        
+        Все запросы выполняются в одном отдельном потоке БД, поэтому
+        обработчики бота не ждут SQLite, а у потока БД одно постоянное
+        соединение из пула Database.
+        
+        Args:
+            db: Экземпляр Database (по умолчанию создается новый в потоке БД)
+        """
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db')
+        if db is None:
+            db = self._executor.submit(Database).result()
+        self.db = db
+    
+    async def run(self, func, *args, **kwargs):
+        """Выполнение произвольной синхронной функции в потоке БД"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def get_stats(self) -> Dict:
+        """Получение статистики"""
+        return await self.run(self.db.get_stats)
+    
+    async def get_config(self, key: str, default: any = None) -> any:
+        """Получение значения конфигурации"""
+        return await self.run(self.db.get_config, key, default)
+    
+    async def set_config(self, key: str, value: any):
+        """Установка значения конфигурации"""
+        return await self.run(self.db.set_config, key, value)
+    
+    async def get_all_config(self) -> Dict:
+        """Получение всей конфигурации"""
+        return await self.run(self.db.get_all_config)
+    
+    async def is_item_found(self, item_id: str) -> bool:
+        """Проверка, найдено ли объявление ранее"""
+        return await self.run(self.db.is_item_found, item_id)
+    
+    async def add_found_items(self, items: List[Item]) -> List[Item]:
+        """Добавление страницы объявлений, возвращает только новые"""
+        return await self.run(self.db.add_found_items_bulk, items)
+    
+    async def get_found_items(self, limit: int = 100, price_min: int = None, price_max: int = None) -> List[Item]:
+        """Получение списка найденных объявлений (с фильтром по цене)"""
+        return await self.run(self.db.get_found_items, limit, price_min, price_max)
+    
+    async def get_price_stats(self, price_min: int = None, price_max: int = None) -> Dict:
+        """Статистика цен найденных объявлений"""
+        return await self.run(self.db.get_price_stats, price_min, price_max)
+    
+    async def search_items(self, query: str, limit: int = 20) -> List[Item]:
+        """Полнотекстовый поиск по сохраненным объявлениям"""
+        return await self.run(self.db.search_items, query, limit)
+    
+    async def get_new_items(self, limit: int = 50) -> List[Item]:
+        """Получение последних новых объявлений"""
+        return await self.run(self.db.get_new_items, limit)
+    
+    async def clear_found_items(self):
+        """Очистить список найденных объявлений"""
+        return await self.run(self.db.clear_found_items)
+    
+    async def close(self):
+        """Закрытие соединений и потока БД"""
+        await self.run(self.db.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,249 @@
+"""
+Асинхронная загрузка страниц поиска для режима requests
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+import aiohttp
+from proxy_pool import ProxyPool, is_blocked_page
+from rate_limiter import RateLimiter
+
+
+# Ответ 304: страница не изменилась с прошлой загрузки
+NOT_MODIFIED = object()
+
+
+class AsyncFetcher:
+    # Одновременных запросов на один хост (Авито режет частые запросы)
+    PER_HOST_LIMIT = 4
+    # Одновременных запросов всего
+    TOTAL_LIMIT = 64
+    # Таймауты запроса (сек)
+    TIMEOUT_SECONDS = 15
+    CONNECT_TIMEOUT_SECONDS = 5
+    
+    DEFAULT_HEADERS = {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+        'Accept-Encoding': 'gzip, deflate',
+        'Upgrade-Insecure-Requests': '1',
+    }
+    
+    def __init__(self, user_agent: Callable[[], str] = None, per_host_limit: int = None,
+                 total_limit: int = None, timeout: float = None, proxy_pool: ProxyPool = None,
+                 rate_limiter: RateLimiter = None):
+        """
+        Конкурентная загрузка многих URL через общий пул keep-alive соединений
+        
+        Event loop и aiohttp.ClientSession живут в отдельном потоке, поэтому
+        соединения переиспользуются между проверками, а вызывать fetch_many
+        можно из обычного синхронного кода.
+        
+        С пулом прокси у каждого прокси своя сессия со своим пулом соединений
+        и своими лимитами, поэтому пропускная способность растет с числом прокси.
+        
+        Args:
+            user_agent: Функция, возвращающая User-Agent для очередного запроса
+            per_host_limit: Лимит одновременных запросов на хост
+            total_limit: Общий лимит одновременных запросов
+            timeout: Таймаут одного запроса (сек)
+            proxy_pool: Пул прокси (по умолчанию прямое соединение)
+            rate_limiter: Ограничение частоты запросов на выходной IP
+        """
+        self.user_agent = user_agent
+        self.per_host_limit = per_host_limit or self.PER_HOST_LIMIT
+        self.total_limit = total_limit or self.TOTAL_LIMIT
+        self.timeout = timeout or self.TIMEOUT_SECONDS
+        self.proxy_pool = proxy_pool
+        self.rate_limiter = rate_limiter or RateLimiter()
+        
+        self._loop = None
+        self._thread = None
+        # Адрес прокси (None - прямое соединение) -> сессия
+        self._sessions = {}
+        # URL -> заголовки для условного запроса (ETag / Last-Modified)
+        self._validators = {}
+        # Cookies, User-Agent и прокси реального браузера (гибридный режим)
+        self.identity = None
+        # URL, на которые пришла блокировка (сбрасывает вызывающий перед проверкой:
+        # одна проверка - несколько пачек, первая страница и листание)
+        self.blocked_urls = set()
+        self._start_lock = threading.Lock()
+    
+    def _ensure_loop(self):
+        """Запуск потока с event loop при первом использовании"""
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='async-fetcher', daemon=True)
+            thread.start()
+            self._loop = loop
+            self._thread = thread
+    
+    async def _get_session(self, proxy_url: Optional[str] = None) -> aiohttp.ClientSession:
+        """Сессия с пулом соединений для прокси (создается внутри event loop)"""
+        session = self._sessions.get(proxy_url)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.total_limit,
+                limit_per_host=self.per_host_limit,
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.DEFAULT_HEADERS,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.timeout,
+                    sock_connect=self.CONNECT_TIMEOUT_SECONDS
+                )
+            )
+            self._sessions[proxy_url] = session
+        return session
+    
+    async def fetch(self, url: str, extra_headers: Dict[str, str] = None):
+        """
+        Загрузка одной страницы
+        
+        Args:
+            url: Адрес
+            extra_headers: Дополнительные заголовки (например Accept для JSON API)
+        
+        Returns:
+            HTML, NOT_MODIFIED если сервер ответил 304, None при ошибке
+        """
+        identity = self.identity
+        if identity:
+            # Cookies действительны только с того IP, где их выдали
+            proxy = identity['proxy']
+        else:
+            proxy = self.proxy_pool.acquire(http_only=True) if self.proxy_pool else None
+        proxy_url = proxy.url if proxy else None
+        egress = self.rate_limiter.egress_key(proxy_url)
+        if not await self.rate_limiter.wait_async(egress):
+            return None
+        
+        session = await self._get_session(proxy_url)
+        headers = dict(self._validators.get(url, {}))
+        if extra_headers:
+            headers.update(extra_headers)
+        if identity:
+            headers['User-Agent'] = identity['user_agent']
+        elif self.user_agent:
+            headers['User-Agent'] = self.user_agent()
+        cookies = identity['cookies'] if identity else None
+        
+        # Лимит на хост держит TCPConnector: лишние запросы ждут свободного соединения
+        started = time.monotonic()
+        try:
+            async with session.get(url, headers=headers, cookies=cookies, proxy=proxy_url) as response:
+                if response.status == 304:
+                    self._report_success(proxy, started)
+                    return NOT_MODIFIED
+                if response.status in (403, 429):
+                    print(f"⚠️ {url}: HTTP {response.status}")
+                    self._report_block(proxy)
+                    self.blocked_urls.add(url)
+                    return None
+                if response.status != 200:
+                    print(f"⚠️ {url}: HTTP {response.status}")
+                    return None
+                html = await response.text()
+                if is_blocked_page(html):
+                    print(f"⚠️ {url}: доступ ограничен")
+                    self._report_block(proxy)
+                    self.blocked_urls.add(url)
+                    return None
+                self._report_success(proxy, started)
+                self._remember_validators(url, response.headers)
+                return html
+        except asyncio.TimeoutError:
+            print(f"⚠️ {url}: превышен таймаут")
+        except aiohttp.ClientError as e:
+            print(f"⚠️ {url}: {e}")
+        if self.proxy_pool:
+            self.proxy_pool.report_error(proxy)
+        return None
+    
+    def _report_success(self, proxy, started: float):
+        """Учет удачного запроса в пуле прокси и ограничителе частоты"""
+        self.rate_limiter.report_success(self.rate_limiter.egress_key(proxy.url if proxy else None))
+        if self.proxy_pool:
+            self.proxy_pool.report_success(proxy, time.monotonic() - started)
+    
+    def _report_block(self, proxy):
+        """Учет блокировки в пуле прокси и ограничителе частоты"""
+        self.rate_limiter.report_block(self.rate_limiter.egress_key(proxy.url if proxy else None))
+        if self.proxy_pool:
+            self.proxy_pool.report_block(proxy)
+    
+    def _remember_validators(self, url: str, headers):
+        """Сохранение ETag / Last-Modified для следующего условного запроса"""
+        validators = {}
+        if headers.get('ETag'):
+            validators['If-None-Match'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = headers['Last-Modified']
+        if validators:
+            self._validators[url] = validators
+        else:
+            self._validators.pop(url, None)
+    
+    def forget(self, url: str):
+        """Следующий запрос URL будет безусловным (например, страницу не удалось обработать)"""
+        self._validators.pop(url, None)
+    
+    def set_identity(self, cookies: Dict[str, str], user_agent: str, proxy=None):
+        """
+        Работа от имени браузерной сессии: ее cookies, User-Agent и прокси
+        
+        Args:
+            cookies: Cookies браузера (имя -> значение)
+            user_agent: User-Agent браузера
+            proxy: Прокси из пула, через который браузер получил cookies
+        """
+        if proxy is not None and not proxy.is_http:
+            print("⚠️ SOCKS прокси браузера не поддерживается aiohttp, запросы пойдут напрямую")
+            proxy = None
+        self.identity = {'cookies': dict(cookies), 'user_agent': user_agent, 'proxy': proxy}
+        # Ответы, полученные без cookies, не должны давать 304 для новой сессии
+        self._validators = {}
+    
+    def clear_identity(self):
+        """Сброс браузерной сессии (например, после проверки на робота)"""
+        self.identity = None
+    
+    async def fetch_all(self, urls: Iterable[str], extra_headers: Dict[str, str] = None) -> Dict[str, object]:
+        """Конкурентная загрузка списка URL"""
+        urls = list(dict.fromkeys(urls))
+        pages = await asyncio.gather(*(self.fetch(url, extra_headers) for url in urls))
+        return dict(zip(urls, pages))
+    
+    def fetch_many(self, urls: Iterable[str], extra_headers: Dict[str, str] = None) -> Dict[str, object]:
+        """
+        Синхронная обертка над fetch_all
+        
+        Returns:
+            Словарь URL -> HTML (NOT_MODIFIED при ответе 304, None при ошибке)
+        """
+        self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.fetch_all(urls, extra_headers), self._loop)
+        return future.result()
+    
+    def close(self):
+        """Закрытие сессии и остановка потока event loop"""
+        if self._loop is None:
+            return
+        
+        async def close_sessions():
+            for session in self._sessions.values():
+                await session.close()
+        
+        asyncio.run_coroutine_threadsafe(close_sessions(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
+        self._sessions = {}
@@ -0,0 +1,185 @@
+"""
+Клиент JSON API поиска Авито, выученного по сетевым запросам браузера
+"""
+import hashlib
+import json
+import re
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from item import Item
+from json_state import items_from_state
+
+
+# ID объявлений в ответе API (для отпечатка без разбора JSON)
+API_ITEM_ID_RE = re.compile(r'"id"\s*:\s*(\d{6,})')
+
+
+def search_value(value) -> str:
+    """Значение поля поиска для сравнения с параметрами запроса"""
+    if not value:
+        return ''
+    return ' '.join(str(value).split()).lower()
+
+
+class AvitoApiClient:
+    # Заголовки запроса к API
+    HEADERS = {
+        'Accept': 'application/json, text/plain, */*',
+        'X-Requested-With': 'XMLHttpRequest',
+    }
+    # Сколько подряд ответов не-JSON терпим, прежде чем забыть эндпоинты
+    MAX_FAILURES = 3
+    # Фильтры поиска (кроме текста), которые должен выразить запрос к API
+    FILTERS = ('location', 'category', 'price_min', 'price_max')
+    # Сколько эндпоинтов (наборов фильтров) помнить
+    MAX_ENDPOINTS = 20
+    
+    def __init__(self, endpoints: List[Dict] = None):
+        """
+        Прямые запросы к API поиска без загрузки HTML
+        
+        Эндпоинт не зашит в код: он берется из запросов, которые браузер сделал
+        во время обычного поиска (AvitoBrowserParser.get_api_responses).
+        
+        Каждый эндпоинт - шаблон запроса одного поиска. Фильтры, значение
+        которых нашлось в параметрах запроса (например pmax=40000), подставляются
+        из любого поиска (fields). Остальные (локация и категория обычно
+        передаются ID) зашиты в шаблон: он подходит только поискам с теми же
+        значениями (fixed).
+        
+        Args:
+            endpoints: Сохраненные ранее эндпоинты (ключ конфигурации api_endpoints)
+        """
+        self.endpoints = [endpoint for endpoint in endpoints or [] if 'fixed' in endpoint]
+        self.failures = 0
+    
+    def learn(self, api_responses: List[Dict], search_params: Dict) -> bool:
+        """
+        Поиск эндпоинта среди перехваченных запросов
+        
+        Подходит JSON-ответ 200, в параметрах которого есть текст запроса.
+        
+        Args:
+            api_responses: Ответы из get_api_responses
+            search_params: Поиск, который браузер открыл перед перехватом
+        
+        Returns:
+            True если эндпоинт найден
+        """
+        query = search_value(search_params.get('query'))
+        if not query:
+            return False
+        
+        best = None
+        best_score = -1
+        for response in api_responses:
+            if response.get('status') != 200:
+                continue
+            headers = {key.lower(): value for key, value in (response.get('headers') or {}).items()}
+            mime_type = response.get('mime_type') or headers.get('content-type', '')
+            if 'json' not in mime_type:
+                continue
+            
+            parts = urlsplit(response.get('url', ''))
+            params = parse_qsl(parts.query, keep_blank_values=True)
+            query_param = next((key for key, value in params if search_value(value) == query), None)
+            if not query_param:
+                continue
+            
+            # Поисковые эндпоинты предпочтительнее остальных, при равенстве - более поздний
+            score = sum(1 for keyword in ('/search', '/items') if keyword in parts.path)
+            if score >= best_score:
+                best_score = score
+                best = {
+                    'url': f"{parts.scheme}://{parts.netloc}{parts.path}",
+                    'params': dict(params),
+                    'query_param': query_param,
+                    'page_param': 'page' if 'page' in dict(params) else 'p',
+                }
+        
+        if best is None:
+            return False
+        
+        # Фильтры, значения которых есть в параметрах, подставляются из поиска
+        fields = {}
+        used = {best['query_param'], best['page_param']}
+        for field in self.FILTERS:
+            value = search_value(search_params.get(field))
+            if not value:
+                continue
+            param = next((key for key, param_value in best['params'].items()
+                          if key not in used and search_value(param_value) == value), None)
+            if param:
+                fields[field] = param
+                used.add(param)
+        best['fields'] = fields
+        best['fixed'] = {field: search_value(search_params.get(field))
+                         for field in self.FILTERS if field not in fields}
+        
+        # Новый шаблон заменяет прежний для того же набора зашитых фильтров
+        self.endpoints = [best] + [endpoint for endpoint in self.endpoints
+                                   if endpoint['fixed'] != best['fixed']][:self.MAX_ENDPOINTS - 1]
+        self.failures = 0
+        print(f"✅ Найден API поиска: {best['url']} (фильтры из поиска: {', '.join(fields) or 'нет'})")
+        return True
+    
+    def endpoint_for(self, search_params: Dict) -> Optional[Dict]:
+        """
+        Эндпоинт, которым можно выразить поиск
+        
+        Returns:
+            None, если ни один шаблон не передает фильтры поиска (поиск идет через HTML)
+        """
+        if not search_value(search_params.get('query')):
+            return None
+        for endpoint in self.endpoints:
+            if all(search_value(search_params.get(field)) == value
+                   for field, value in endpoint['fixed'].items()):
+                return endpoint
+        return None
+    
+    def build_url(self, search_params: Dict, page: int = 1) -> str:
+        """URL запроса к API для поиска и страницы (поиск должен проходить endpoint_for)"""
+        endpoint = self.endpoint_for(search_params)
+        if endpoint is None:
+            raise ValueError(f"API поиска не выражает поиск: {search_params}")
+        
+        params = dict(endpoint['params'])
+        params[endpoint['query_param']] = search_params.get('query', '')
+        for field, param in endpoint['fields'].items():
+            value = search_params.get(field)
+            if value:
+                params[param] = value
+            else:
+                params.pop(param, None)
+        page_param = endpoint['page_param']
+        if page > 1 or page_param in params:
+            params[page_param] = page
+        return f"{endpoint['url']}?{urlencode(params)}"
+    
+    def parse(self, text: str) -> Optional[List[Item]]:
+        """
+        Объявления из ответа API
+        
+        Returns:
+            Список объявлений или None, если ответ не JSON (эндпоинт устарел)
+        """
+        try:
+            data = json.loads(text)
+        except ValueError:
+            self.failures += 1
+            if self.failures >= self.MAX_FAILURES:
+                print("⚠️ API поиска перестал отвечать JSON, эндпоинты будут найдены заново")
+                self.endpoints = []
+            return None
+        
+        self.failures = 0
+        return items_from_state(data)
+    
+    @staticmethod
+    def fingerprint(text: str) -> Optional[str]:
+        """Отпечаток ответа по последовательности ID (без разбора JSON)"""
+        ids = API_ITEM_ID_RE.findall(text)
+        if not ids:
+            return None
+        return hashlib.blake2b(','.join(ids).encode(), digest_size=16).hexdigest()
@@ -1,63 +1,149 @@
 """
 Парсер объявлений с Авито
 """
-import requests
-from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 import json
 import time
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
 import os
+import hashlib
 from database import Database
+from item import Item
 from avito_browser_parser import AvitoBrowserParser
-from avito_browser_parser import AvitoBrowserParser
+from async_fetcher import AsyncFetcher, NOT_MODIFIED
+from proxy_pool import ProxyPool, is_blocked_page, mask_proxy
+from rate_limiter import RateLimiter
+from json_state import ITEM_ID_RE, extract_items
+from avito_api import AvitoApiClient
+from search_cache import SearchCache, canonical_url
+from parser_backends import ITEM_STRATEGIES, extract_item, get_parser_backend, parse_document
+from selector_stats import SelectorRegistry
+from parse_pool import ParsePool, available_cores, items_from_rows
+from watermark import Watermark
+
+
+def page_fingerprint(html: str) -> Optional[str]:
+    """
+    Отпечаток выдачи по последовательности ID объявлений
+    
+    Считается регуляркой без построения DOM. None - ID не нашлись
+    (изменилась верстка), такую страницу нужно разбирать полностью.
+    """
+    ids = ITEM_ID_RE.findall(html)
+    if not ids:
+        return None
+    return hashlib.blake2b(','.join(ids).encode(), digest_size=16).hexdigest()
 
 
 class AvitoParser:
-    def __init__(self, config_path: str = "config.json", notify_callback=None, use_db: bool = True, use_browser: bool = True):
+    # Сколько страниц выдачи листать за проверку (если все объявления на странице новые)
+    MAX_PAGES = 5
+    # Ограничение объявлений со страницы (0 - все; при листании ограничение
+    # приводит к пропуску объявлений в конце страницы)
+    MAX_ITEMS_PER_PAGE = 0
+    # Сколько верхних объявлений первой выдачи поиска присылать (остальные
+    # только запоминаются, как раньше при разборе 30 объявлений со страницы)
+    FIRST_RUN_NOTIFY = 30
+    # Способы проверки: браузер на каждую проверку, только HTTP, браузер только за cookies,
+    # JSON API поиска (эндпоинт и cookies добывает браузер)
+    BACKENDS = ('browser', 'requests', 'hybrid', 'api')
+    # Ключи, которые save_config пишет в БД, если вызывающий не указал свои
+    SAVED_CONFIG_KEYS = ('search_params', 'check_interval_minutes', 'notify_on_new')
+    
+    def __init__(self, config_path: str = "config.json", notify_callback=None, use_db: bool = True, use_browser: bool = True,
+                 db: Optional[Database] = None, backend: str = None, search_cache: SearchCache = None):
         """
         Инициализация парсера
         
         Args:
             config_path: Путь к файлу конфигурации (используется как fallback)
-            notify_callback: Функция для отправки уведомлений (принимает item: Dict)
+            notify_callback: Функция для отправки уведомлений (принимает item: Item)
             use_db: Использовать SQLite базу данных вместо JSON файлов
             use_browser: Использовать браузер (Selenium) для парсинга
+            db: Готовый экземпляр Database (например общий с ботом)
+            backend: 'browser', 'requests', 'hybrid' или 'api' (по умолчанию ключ конфигурации
+                backend, иначе 'browser' при use_browser и 'requests' без него)
+            search_cache: Общий кэш выдачи (чтобы несколько парсеров делили загрузки)
         """
         self.config_path = config_path
         self.use_db = use_db
         self.use_browser = use_browser
+        self.backend = backend
+        
+        # Версия конфигурации в БД, с которой загружен self.config
+        self._config_version = None
         
         # Инициализируем базу данных
         if use_db:
-            self.db = Database()
+            self.db = db or Database()
             self.config = self.load_config_from_db()
+            # Фоновая очистка старых объявлений и vacuum
+            self.db.start_maintenance()
         else:
             self.db = None
             self.config = self.load_config()
         
+        # Пул прокси: ключ конфигурации proxies и AVITO_PROXIES / AVITO_PROXY_FILE / AVITO_PROXY
+        self.proxy_pool = ProxyPool.from_env(self.config.get('proxies', []))
+        # Общий для всех способов загрузки лимит частоты (параметры - ключ rate_limit)
+        self.rate_limiter = RateLimiter(**self.config.get('rate_limit', {}))
+        # Какие селекторы срабатывают на страницах (сохраняется в ключ selector_stats)
+        self.selectors = SelectorRegistry(self.config.get('selector_stats'), on_change=self.save_selector_stats)
+        
         # Инициализируем браузерный парсер если нужно (но не создаем браузер сразу)
-        if use_browser:
-            # Проверяем наличие прокси в переменных окружения
-            import os
-            proxy = os.getenv('AVITO_PROXY', None)
-            self.browser_parser = AvitoBrowserParser(headless=True, proxy=proxy)
+        if use_browser or self.get_backend() in ('hybrid', 'api'):
+            self.browser_parser = AvitoBrowserParser(
+                headless=True,
+                proxy_pool=self.proxy_pool,
+                rate_limiter=self.rate_limiter,
+                selector_registry=self.selectors
+            )
             # Не инициализируем браузер сразу, только при первом использовании
             self.browser_parser.driver = None
         else:
             self.browser_parser = None
+        if not use_browser:
             self.ua = UserAgent()
-            self.session = requests.Session()
+        
+        # Асинхронный загрузчик для режима requests (создается при первом использовании)
+        self.fetcher = None
+        # URL -> отпечаток последней обработанной выдачи
+        self._page_fingerprints = {}
+        # URL -> ID с верха последней обработанной выдачи (водяной знак)
+        self._watermarks = {}
+        # Клиент JSON API поиска (эндпоинты сохраняются в ключе конфигурации api_endpoints)
+        self.api_client = AvitoApiClient(self.config.get('api_endpoints'))
+        # Ключи поисков, для которых браузер не нашел API (проверяются через HTML)
+        self._api_unlearnable = set()
+        # Одновременные проверки одной выдачи загружают и разбирают ее один раз
+        self.search_cache = search_cache or SearchCache(self.config.get('search_cache_ttl'))
+        # Подписчик -> ID отправленных ему объявлений (без БД)
+        self._subscriber_seen = {}
+        # URL страниц, уже обработанных в этом процессе: первую выдачу поиска не листаем
+        self._checked_urls = set()
+        # Бэкенд разбора DOM и имя из конфигурации, по которому он выбран (ключ html_parser)
+        self._html_backend = None
+        self._html_backend_name = None
+        # Пул процессов для разбора многих страниц (ключ parse_workers, по умолчанию выключен)
+        self.parse_pool = None
         
         self.notify_callback = notify_callback
         
+    def get_backend(self) -> str:
+        """Текущий способ проверки (конфигурацию могут поменять на лету)"""
+        backend = self.backend or self.config.get('backend')
+        if backend not in self.BACKENDS:
+            backend = 'browser' if self.use_browser else 'requests'
+        return backend
+    
     def load_config_from_db(self) -> dict:
         """Загрузка конфигурации из базы данных"""
         if not self.db:
             return self.load_config()
         
-        # Загружаем конфигурацию из БД
+        # Загружаем конфигурацию из БД (из кэша, если она не менялась)
+        self._config_version = self.db.get_config_version()
         config = self.db.get_all_config()
         
         if 'search_params' not in config or not config.get('search_params', {}).get('query'):
@@ -91,12 +177,32 @@ class AvitoParser:
             "notify_on_new": config.get('notify_on_new', True)
         }
         
+        # Остальные ключи (searches и т.п.) переносим как есть
+        for key, value in config.items():
+            result.setdefault(key, value)
+        
         # Если query пустой, ставим дефолт
         if not result['search_params'].get('query'):
             result['search_params']['query'] = "iphone"
         
         return result
     
+    def refresh_config(self) -> bool:
+        """
+        Перечитать конфигурацию, если ее изменили в БД (другой процесс или бот)
+        
+        Returns:
+            True если конфигурация была перечитана
+        """
+        if not (self.use_db and self.db):
+            return False
+        if self.db.get_config_version() == self._config_version:
+            return False
+        
+        self.config = self.load_config_from_db()
+        print("🔄 Конфигурация обновлена из БД")
+        return True
+    
     def load_config(self) -> dict:
         """Загрузка конфигурации из файла (fallback)"""
         try:
@@ -122,28 +228,63 @@ class AvitoParser:
             }
             return default_config
     
-    def save_config_to_db(self, config: dict = None):
-        """Сохранение конфигурации в базу данных"""
+    def save_config_to_db(self, config: dict = None, keys: Sequence[str] = None):
+        """
+        Сохранение конфигурации в базу данных
+        
+        Пишутся только ключи, которые меняет вызывающий: копия конфигурации
+        в памяти может устареть, и запись всех ключей затерла бы то, что
+        с тех пор изменил другой процесс (searches, proxies, retention...).
+        
+        Args:
+            keys: Сохраняемые ключи (по умолчанию SAVED_CONFIG_KEYS)
+        """
         if not self.db:
             self.save_config(config)
             return
         
         if config is None:
             config = self.config
+        if keys is None:
+            keys = self.SAVED_CONFIG_KEYS
+        
+        defaults = {
+            'search_params': {},
+            'check_interval_minutes': 1,
+            'notify_on_new': True
+        }
+        values = {key: config.get(key, defaults.get(key)) for key in keys}
         
-        # Сохраняем каждое значение отдельно
-        self.db.set_config('search_params', config.get('search_params', {}))
-        self.db.set_config('check_interval_minutes', config.get('check_interval_minutes', 1))
-        self.db.set_config('notify_on_new', config.get('notify_on_new', True))
+        # Чужие изменения, сделанные до нашей записи, refresh_config должен перечитать
+        foreign_changes = self.db.get_config_version() != self._config_version
+        # Сохраняем все значения одной транзакцией
+        self.db.set_configs(values)
+        if not foreign_changes:
+            self._config_version = self.db.get_config_version()
     
-    def save_config(self, config: dict = None):
-        """Сохранение конфигурации в файл (fallback)"""
+    def save_config(self, config: dict = None, keys: Sequence[str] = None):
+        """
+        Сохранение конфигурации в файл (fallback)
+        
+        Args:
+            keys: Сохраняемые ключи: остальные берутся из файла, который могли
+                изменить вручную или через setup_params.py (по умолчанию - все)
+        """
         if self.use_db and self.db:
-            self.save_config_to_db(config)
+            self.save_config_to_db(config, keys)
             return
         
         if config is None:
             config = self.config
+        if keys is not None:
+            try:
+                with open(self.config_path, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = None
+            if isinstance(stored, dict):
+                stored.update({key: config[key] for key in keys if key in config})
+                config = stored
         with open(self.config_path, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
     
@@ -155,7 +296,7 @@ class AvitoParser:
             # Fallback на старый метод (для совместимости)
             return item_id in self.load_found_items()
     
-    def add_found_item(self, item: Dict) -> bool:
+    def add_found_item(self, item: Item) -> bool:
         """Добавление найденного объявления"""
         if self.use_db and self.db:
             return self.db.add_found_item(item)
@@ -173,6 +314,29 @@ class AvitoParser:
             self.save_found_items_set(found_items)
             return True
     
+    def add_found_items_bulk(self, items: List[Item]) -> List[Item]:
+        """
+        Добавление страницы объявлений за один раз
+        
+        Returns:
+            Только новые объявления (которых ранее не было)
+        """
+        if self.use_db and self.db:
+            return self.db.add_found_items_bulk(items)
+        
+        # Fallback: один раз читаем и один раз сохраняем JSON файл
+        found_items = self.load_found_items()
+        new_items = []
+        for item in items:
+            item_id = item.get('id')
+            if item_id and item_id not in found_items:
+                found_items.add(item_id)
+                new_items.append(item)
+        
+        if new_items:
+            self.save_found_items_set(found_items)
+        return new_items
+    
     def load_found_items(self) -> set:
         """Загрузка списка уже найденных объявлений (для fallback)"""
         if self.use_db and self.db:
@@ -196,12 +360,42 @@ class AvitoParser:
         # Метод больше не нужен при использовании БД, но оставлен для обратной совместимости
         pass
     
-    def build_url(self) -> str:
-        """Построение URL для поиска на Авито"""
+    def get_searches(self) -> List[Dict]:
+        """
+        Список поисков для проверки
+        
+        Несколько поисков задаются ключом конфигурации searches (список
+        словарей в формате search_params), иначе проверяется один search_params.
+        """
+        searches = self.config.get('searches') or []
+        if not searches:
+            search_params = self.config.get('search_params', {})
+            if search_params.get('query'):
+                searches = [search_params]
+        return [params for params in searches if params.get('query') or params.get('category')]
+    
+    def save_selector_stats(self, stats: Dict):
+        """Сохранение статистики селекторов между перезапусками"""
+        self.config['selector_stats'] = stats
+        # Своя запись не должна выглядеть для refresh_config как чужое изменение
+        self.save_config(self.config, keys=['selector_stats'])
+    
+    def search_key(self, search_params: Dict) -> str:
+        """Канонический ключ поиска: одинаковые поиски разных подписчиков совпадают"""
+        return canonical_url(self.build_url(search_params))
+    
+    def build_url(self, search_params: Dict = None, page: int = 1) -> str:
+        """
+        Построение URL для поиска на Авито
+        
+        Args:
+            search_params: Параметры поиска (по умолчанию search_params из конфигурации)
+            page: Номер страницы выдачи
+        """
         from urllib.parse import quote, urlencode
         
         base_url = "https://www.avito.ru"
-        params = self.config['search_params']
+        params = search_params if search_params is not None else self.config['search_params']
         
         # Формируем путь поиска
         path_parts = []
@@ -230,6 +424,9 @@ class AvitoParser:
         if params.get('sort'):
             query_params['s'] = params['sort']
         
+        if page and page > 1:
+            query_params['p'] = page
+        
         # Строим URL
         if path_parts:
             url = f"{base_url}/{'/'.join(path_parts)}"
@@ -241,205 +438,105 @@ class AvitoParser:
         
         return url
     
-    def get_page(self, url: str) -> Optional[BeautifulSoup]:
-        """Получение HTML страницы"""
-        try:
-            headers = {
-                'User-Agent': self.ua.random,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-            
-            response = self.session.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            return BeautifulSoup(response.text, 'html.parser')
-        except Exception as e:
-            print(f"Ошибка при получении страницы: {e}")
-            return None
+    def get_html_backend(self):
+        """Бэкенд разбора DOM: 'lxml' (по умолчанию, если установлен) или 'bs4'"""
+        name = self.config.get('html_parser')
+        if self._html_backend is None or name != self._html_backend_name:
+            self._html_backend = get_parser_backend(name)
+            self._html_backend_name = name
+        return self._html_backend
     
-    def parse_items(self, soup: BeautifulSoup) -> List[Dict]:
-        """Парсинг объявлений со страницы"""
+    def parse_html(self, html: str, limit: int = None, watermark: Watermark = None) -> List[Item]:
+        """
+        Объявления со страницы поиска
+        
+        Сначала ищется JSON, встроенный в страницу (без построения DOM, с числовой
+        ценой, городом, временем и фото), DOM разбирается только если JSON нет.
+        
+        Args:
+            watermark: Водяной знак выдачи - вернуть только объявления выше
+                уже виденных (None - все объявления)
+        """
+        items = extract_items(html)
+        if items is None:
+            return self.parse_items(self.get_html_backend().parse(html), limit, watermark)
+        
+        if limit is None:
+            limit = self.config.get('max_items_per_page', self.MAX_ITEMS_PER_PAGE)
+        if limit:
+            items = items[:limit]
+        print(f"Найдено объявлений в JSON страницы: {len(items)}")
+        if watermark is not None:
+            items = watermark.cut(items)
+        return items
+    
+    def parse_items(self, soup, limit: int = None, watermark: Watermark = None) -> List[Item]:
+        """
+        Парсинг объявлений со страницы
+        
+        Args:
+            soup: Разобранная страница (BeautifulSoup или документ lxml)
+            limit: Максимум объявлений (по умолчанию max_items_per_page из конфигурации, 0 - все)
+            watermark: Водяной знак выдачи: поля разбираются только у объявлений
+                выше уже виденных (None - у всех)
+        """
         items = []
+        if limit is None:
+            limit = self.config.get('max_items_per_page', self.MAX_ITEMS_PER_PAGE)
         
-        if not soup:
+        if soup is None:
             return items
         
         # Ищем контейнеры с объявлениями
-        # Авито использует различные селекторы, попробуем несколько вариантов
-        item_selectors = [
-            'div[data-marker="item"]',
-            'div[data-marker*="item"]',
-            'article[data-marker="item"]',
-            'div[itemprop="itemListElement"]',
-            'div[class*="iva-item"]',
-            'div[class*="item-root"]',
-        ]
-        
-        item_elements = []
-        for selector in item_selectors:
-            found = soup.select(selector)
-            if found:
-                item_elements = found
-                break
-        
-        # Если не нашли через селекторы, пробуем найти по структуре
-        if not item_elements:
-            # Ищем все div с классами содержащими item
-            item_elements = soup.find_all('div', class_=lambda x: x and (
-                'item' in str(x).lower() or 
-                'iva-item' in str(x).lower() or
-                'item-root' in str(x).lower()
-            ))
-        
-        # Также пробуем найти через data-item-id
-        if not item_elements:
-            item_elements = soup.find_all(attrs={'data-item-id': True})
-        
-        print(f"Найдено элементов на странице: {len(item_elements)}")
-        
-        for item in item_elements[:30]:  # Ограничиваем до 30 объявлений за раз
-            try:
-                item_data = self.extract_item_data(item)
-                if item_data and item_data.get('id'):
-                    items.append(item_data)
-            except Exception as e:
-                print(f"Ошибка при парсинге объявления: {e}")
-                continue
-        
+        # Авито использует различные селекторы: сначала сработавший в прошлый раз,
+        # обход всего дерева - только если не сработал ни один
+        strategies = self.selectors.order('search_items', ITEM_STRATEGIES)
+        strategy, tried, items = parse_document(soup, strategies, limit, watermark)
+        self.selectors.record('search_items', strategy, tried)
         return items
     
-    def extract_item_data(self, item_element) -> Optional[Dict]:
-        """Извлечение данных из объявления"""
-        try:
-            # Получаем ID объявления
-            item_id = None
-            item_link = None
-            
-            # Сначала пробуем найти data-item-id
-            item_id = item_element.get('data-item-id')
-            
-            # Ищем ссылку на объявление
-            link_elem = item_element.find('a', href=True)
-            if link_elem:
-                item_link = link_elem.get('href', '')
-                if item_link.startswith('/'):
-                    item_link = f"https://www.avito.ru{item_link}"
-                
-                # Извлекаем ID из ссылки если еще не нашли
-                if not item_id:
-                    if '/items/' in item_link:
-                        item_id = item_link.split('/items/')[-1].split('?')[0]
-                    elif '/i' in item_link:
-                        # Формат: /category/location/i/item_id
-                        parts = item_link.split('/')
-                        for i, part in enumerate(parts):
-                            if part == 'i' and i + 1 < len(parts):
-                                item_id = parts[i + 1].split('?')[0]
-                                break
-                    else:
-                        # Пробуем найти ID в любом месте ссылки
-                        import re
-                        match = re.search(r'/(\d+)(?:\?|$)', item_link)
-                        if match:
-                            item_id = match.group(1)
-            
-            # Если все еще нет ID, пробуем найти в других атрибутах
-            if not item_id:
-                item_id = item_element.get('id', '')
-                # Убираем префиксы если есть
-                if item_id and '_' in item_id:
-                    item_id = item_id.split('_')[-1]
-            
-            if not item_id:
-                return None
-            
-            # Получаем заголовок
-            title = ""
-            # Пробуем разные варианты поиска заголовка
-            title_selectors = [
-                ('h3', lambda x: 'title' in str(x).lower()),
-                ('a', lambda x: 'title' in str(x).lower() or 'link' in str(x).lower()),
-                ('div', lambda x: 'title' in str(x).lower()),
-                ('span', lambda x: 'title' in str(x).lower()),
-            ]
-            
-            for tag, class_check in title_selectors:
-                title_elem = item_element.find(tag, class_=class_check)
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-                    break
-            
-            # Если не нашли, берем первый заголовок или ссылку
-            if not title:
-                title_elem = item_element.find(['h3', 'h2', 'h1', 'a'])
-                if title_elem:
-                    title = title_elem.get_text(strip=True)
-            
-            # Получаем цену
-            price = ""
-            price_selectors = [
-                ('span', lambda x: 'price' in str(x).lower()),
-                ('div', lambda x: 'price' in str(x).lower()),
-            ]
-            
-            for tag, class_check in price_selectors:
-                price_elem = item_element.find(tag, class_=class_check)
-                if price_elem:
-                    price = price_elem.get_text(strip=True)
-                    if price:
-                        break
-            
-            # Пробуем через meta
-            if not price:
-                price_elem = item_element.find('meta', {'itemprop': 'price'})
-                if price_elem:
-                    price = price_elem.get('content', '')
-            
-            # Получаем описание/локацию
-            description = ""
-            desc_elem = item_element.find(['div', 'span'], class_=lambda x: x and (
-                'description' in str(x).lower() or 
-                'location' in str(x).lower() or
-                'geo' in str(x).lower()
-            ))
-            if desc_elem:
-                description = desc_elem.get_text(strip=True)
-            
-            return {
-                'id': str(item_id),
-                'title': title,
-                'price': price,
-                'description': description,
-                'link': item_link or f"https://www.avito.ru/item/{item_id}",
-                'found_at': datetime.now().isoformat()
-            }
-        except Exception as e:
-            print(f"Ошибка при извлечении данных: {e}")
-            return None
+    def extract_item_data(self, item_element) -> Optional[Item]:
+        """Извлечение данных из объявления (элемент BeautifulSoup или lxml)"""
+        return extract_item(item_element)
     
-    def check_new_items(self) -> List[Dict]:
-        """Проверка новых объявлений"""
+    def check_new_items(self) -> List[Item]:
+        """
+        Проверка новых объявлений
+        
+        Returns:
+            Новые объявления общих поисков (объявления поисков с подписчиком
+            уходят только через notify_callback)
+        """
+        # Подхватываем изменения конфигурации без полного перечитывания
+        self.refresh_config()
+        
         search_params = self.config.get('search_params', {})
         query = search_params.get('query', '')
+        searches = self.get_searches()
         
-        if not query:
+        if not searches:
             print("❌ Параметры поиска не заданы!")
             return []
         
+        if not query:
+            query = searches[0].get('query', '')
+        
         print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Проверяю запрос: {query}")
         
-        # Используем браузерный парсер если включен
-        if self.use_browser and self.browser_parser:
+        backend = self.get_backend()
+        if backend == 'api':
+            # Браузер только находит эндпоинты API, дальше запросы идут без HTML
+            return self.check_new_items_api()
+        elif backend == 'hybrid':
+            # Браузер только добывает cookies, проверка идет по HTTP
+            return self.check_new_items_hybrid()
+        elif backend == 'browser' and self.browser_parser:
             return self.check_new_items_browser(query)
         else:
             # Используем старый метод через requests
             return self.check_new_items_requests()
     
-    def check_new_items_browser(self, query: str) -> List[Dict]:
+    def check_new_items_browser(self, query: str) -> List[Item]:
         """Проверка новых объявлений через браузер"""
         browser_was_init = False
         try:
@@ -455,12 +552,11 @@ class AvitoParser:
                 # Проверяем, не заблокирован ли доступ
                 if hasattr(self.browser_parser, 'driver') and self.browser_parser.driver:
                     try:
-                        page_text = self.browser_parser.driver.page_source.lower()
-                        if "доступ ограничен" in page_text or "проблема с ip" in page_text:
+                        if is_blocked_page(self.browser_parser.driver.page_source):
+                            # Прокси уходит на паузу, следующий запуск браузера возьмет другой
+                            self.proxy_pool.report_block(self.browser_parser.current_proxy)
+                            # Частоту запросов уже снизил ограничитель браузерного парсера
                             print("⚠️ Авито заблокировал IP. Пропускаю эту проверку.")
-                            print("💡 Рекомендации:")
-                            print("   - Увеличьте интервал проверки (минимум 5-10 минут)")
-                            print("   - Подождите некоторое время перед следующей проверкой")
                             return []  # Возвращаем пустой список, не считаем это ошибкой
                     except:
                         pass
@@ -488,20 +584,20 @@ class AvitoParser:
                 item_id = hashlib.md5(link.encode()).hexdigest()[:16]
             
             # Создаем объект объявления
-            item = {
-                'id': item_id,
-                'title': last_item.get('title', ''),
-                'price': last_item.get('price', ''),
-                'description': '',
-                'link': link,
-                'found_at': datetime.now().isoformat()
-            }
+            item = Item(
+                item_id,
+                title=last_item.get('title', ''),
+                price_text=last_item.get('price', ''),
+                link=link,
+            )
+            
+            self.proxy_pool.report_success(self.browser_parser.current_proxy)
             
             # Просто отправляем объявление без проверки
             new_items = [item]
             
             # Сохраняем в БД
-            self.add_found_item(item)
+            self.add_found_items_bulk(new_items)
             
             # Отправляем уведомление
             if self.config.get('notify_on_new', True):
@@ -533,46 +629,512 @@ class AvitoParser:
                 except Exception as e:
                     print(f"⚠️ Ошибка при закрытии браузера: {e}")
     
-    def check_new_items_requests(self) -> List[Dict]:
-        """Проверка новых объявлений через requests (старый метод)"""
-        url = self.build_url()
-        print(f"Проверяю URL: {url}")
+    def get_fetcher(self) -> AsyncFetcher:
+        """Общий асинхронный загрузчик (пул keep-alive соединений)"""
+        if self.fetcher is None:
+            ua = getattr(self, 'ua', None) or UserAgent()
+            self.fetcher = AsyncFetcher(
+                user_agent=lambda: ua.random,
+                proxy_pool=self.proxy_pool,
+                rate_limiter=self.rate_limiter
+            )
+        return self.fetcher
+    
+    def has_seen_items(self, items: List[Item]) -> bool:
+        """Есть ли среди объявлений хотя бы одно уже найденное ранее"""
+        if self.use_db and self.db:
+            return any(self.db.is_item_found(item['id']) for item in items if item.get('id'))
+        
+        found_items = self.load_found_items()
+        return any(item.get('id') in found_items for item in items)
+    
+    def fetch_pages(self, urls: List[str], api: bool = False) -> Dict[str, object]:
+        """Конкурентная загрузка страниц поиска, URL -> HTML или JSON (NOT_MODIFIED / None)"""
+        return self.get_fetcher().fetch_many(urls, AvitoApiClient.HEADERS if api else None)
+    
+    def parse_pages(self, pages: Dict[str, object], api: bool = False) -> Dict[str, Optional[Dict]]:
+        """
+        Разбор загруженной выдачи
+        
+        Изменившиеся HTML страницы разбираются пачкой (parse_html_batch).
+        Разбор каждой страницы останавливается на водяном знаке ее URL.
+        
+        Args:
+            pages: URL -> HTML или JSON (NOT_MODIFIED / None)
+            api: Ответы JSON API вместо HTML страниц
+        
+        Returns:
+            URL -> {'fingerprint', 'items', 'watermark'}, где items=None - выдача
+            не изменилась, или None, если страницу не удалось получить или разобрать
+        """
+        results = {}
+        changed = {}
+        for url, page in pages.items():
+            if page is NOT_MODIFIED:
+                results[url] = {'fingerprint': None, 'items': None, 'watermark': None}
+                continue
+            if not page:
+                results[url] = None
+                continue
+            
+            fingerprint = self.api_client.fingerprint(page) if api else page_fingerprint(page)
+            results[url] = {'fingerprint': fingerprint, 'items': None, 'watermark': self.get_watermark(url)}
+            if not (fingerprint and self._page_fingerprints.get(url) == fingerprint):
+                changed[url] = page
         
-        soup = self.get_page(url)
-        if not soup:
-            print("Не удалось получить страницу")
+        if not api:
+            watermarks = [results[url]['watermark'] for url in changed]
+            parsed = self.parse_html_batch(list(changed.values()), watermarks)
+            for url, (items, watermark) in zip(changed, parsed):
+                results[url]['items'] = items
+                results[url]['watermark'] = watermark
+            return results
+        
+        limit = self.config.get('max_items_per_page', self.MAX_ITEMS_PER_PAGE)
+        for url, page in changed.items():
+            items = self.api_client.parse(page)
+            if items is None:
+                print(f"⚠️ API вернул не JSON: {url}")
+                self.fetcher.forget(url)
+                results[url] = None
+                continue
+            if limit:
+                items = items[:limit]
+            watermark = results[url]['watermark']
+            results[url]['items'] = watermark.cut(items) if watermark is not None else items
+        return results
+    
+    def get_watermark(self, url: str) -> Optional[Watermark]:
+        """
+        Водяной знак выдачи URL для разбора (ключ конфигурации incremental_parse)
+        
+        Returns:
+            None, если разбор всей страницы включен в конфигурации
+        """
+        if not self.config.get('incremental_parse', True):
+            return None
+        return Watermark(self._watermarks.get(url, ()))
+    
+    def get_parse_pool(self) -> Optional[ParsePool]:
+        """
+        Пул процессов для разбора (ключ конфигурации parse_workers)
+        
+        0 или нет ключа - разбор в этом процессе, "auto" - по числу ядер,
+        число - столько процессов.
+        """
+        workers = self.config.get('parse_workers') or 0
+        if workers == 'auto':
+            workers = available_cores()
+        try:
+            workers = int(workers)
+        except (TypeError, ValueError):
+            workers = 0
+        
+        if workers <= 1:
+            if self.parse_pool is not None:
+                self.parse_pool.close()
+                self.parse_pool = None
+            return None
+        if self.parse_pool is None or self.parse_pool.workers != workers:
+            if self.parse_pool is not None:
+                self.parse_pool.close()
+            self.parse_pool = ParsePool(workers)
+        return self.parse_pool
+    
+    def parse_html_batch(self, pages: List[str],
+                         watermarks: List[Optional[Watermark]] = None) -> List[Tuple[List[Item], Optional[Watermark]]]:
+        """
+        Разбор нескольких страниц: в пуле процессов, если он включен
+        
+        Args:
+            watermarks: Водяные знаки страниц в порядке pages (None - разбирать все)
+        
+        Returns:
+            (объявления, водяной знак после разбора) для каждой страницы в порядке pages
+        """
+        watermarks = watermarks or [None] * len(pages)
+        pool = self.get_parse_pool()
+        if pool is None or len(pages) < 2:
+            return [(self.parse_html(html, watermark=watermark), watermark) for html, watermark in zip(pages, watermarks)]
+        
+        limit = self.config.get('max_items_per_page', self.MAX_ITEMS_PER_PAGE)
+        strategies = self.selectors.order('search_items', ITEM_STRATEGIES)
+        try:
+            results = pool.parse(pages, self.get_html_backend().name, strategies, limit, watermarks)
+        except Exception as e:
+            # Упавший процесс ломает весь пул: следующий запустится заново
+            print(f"⚠️ Ошибка в пуле разбора, разбираю в этом процессе: {e}")
+            pool.close()
+            return [(self.parse_html(html, watermark=watermark), watermark) for html, watermark in zip(pages, watermarks)]
+        
+        parsed = []
+        for source, strategy, tried, rows, watermark in results:
+            if source == 'dom':
+                self.selectors.record('search_items', strategy, tried)
+            else:
+                print(f"Найдено объявлений в JSON страницы: {len(rows)}")
+            # Процесс вернул копию водяного знака с отметками о совпадениях
+            parsed.append((items_from_rows(rows), watermark))
+        return parsed
+    
+    def load_pages(self, urls: List[str], api: bool = False) -> Dict[str, Optional[Dict]]:
+        """
+        Загрузка и разбор выдачи через общий кэш
+        
+        Одинаковые URL (с точностью до canonical_url), которые одновременно
+        проверяют несколько потоков, загружаются и разбираются один раз.
+        
+        Returns:
+            Словарь URL -> результат parse_pages
+        """
+        keys = {canonical_url(url): url for url in urls}
+        
+        def loader(owned: List[str]) -> Dict[str, Optional[Dict]]:
+            owned_urls = [keys[key] for key in owned]
+            pages = self.fetch_pages(owned_urls, api)
+            parsed = self.parse_pages({url: pages.get(url) for url in owned_urls}, api)
+            return {canonical_url(url): result for url, result in parsed.items()}
+        
+        results = self.search_cache.get_many(keys, loader)
+        return {url: results.get(canonical_url(url)) for url in urls}
+    
+    def add_subscriber_items(self, subscriber: str, items: List[Item]) -> List[Item]:
+        """
+        Объявления, которые подписчик еще не получал
+        
+        Первая выдача нового подписчика запоминается без уведомлений, иначе
+        он получил бы сразу всю текущую страницу.
+        """
+        if self.use_db and self.db:
+            first = not self.db.has_subscriber_items(subscriber)
+            new_items = self.db.add_subscriber_items(subscriber, items)
+        else:
+            seen = self._subscriber_seen.setdefault(str(subscriber), set())
+            first = not seen
+            new_items = []
+            for item in items:
+                if item.get('id') and item['id'] not in seen:
+                    seen.add(item['id'])
+                    new_items.append(item)
+        
+        if first and new_items:
+            print(f"📋 Новый подписчик {subscriber}: запомнено объявлений без уведомлений: {len(new_items)}")
             return []
+        return new_items
+    
+    def dispatch_notification(self, item: Item):
+        """Уведомление о новом объявлении в консоль и в callback"""
+        if not self.config.get('notify_on_new', True):
+            return
+        self.notify_new_item(item)
+        # Вызываем callback если он установлен (для Telegram бота)
+        if self.notify_callback:
+            try:
+                self.notify_callback(item)
+            except Exception as e:
+                print(f"Ошибка в callback уведомления: {e}")
+    
+    def get_browser_parser(self) -> AvitoBrowserParser:
+        """Браузерный парсер (создается при первом использовании)"""
+        if self.browser_parser is None:
+            self.browser_parser = AvitoBrowserParser(
+                headless=True,
+                proxy_pool=self.proxy_pool,
+                rate_limiter=self.rate_limiter,
+                selector_registry=self.selectors
+            )
+        return self.browser_parser
+    
+    def bootstrap_session(self) -> bool:
+        """
+        Получение cookies и User-Agent через браузер для HTTP-запросов
         
-        items = self.parse_items(soup)
-        new_items = []
+        Браузер открывает главную страницу, отдает сессию загрузчику и сразу
+        закрывается.
         
-        for item in items:
-            item_id = item.get('id')
-            if item_id:
-                # Проверяем через БД или set
-                if not self.is_item_found(item_id):
-                    # Добавляем объявление
-                    is_new = self.add_found_item(item)
-                    if is_new:
-                        new_items.append(item)
-                        
-                        if self.config.get('notify_on_new', True):
-                            self.notify_new_item(item)
-                            # Вызываем callback если он установлен (для Telegram бота)
-                            if self.notify_callback:
-                                try:
-                                    self.notify_callback(item)
-                                except Exception as e:
-                                    print(f"Ошибка в callback уведомления: {e}")
+        Returns:
+            True если сессия получена
+        """
+        browser_parser = self.get_browser_parser()
+        try:
+            session = browser_parser.export_session()
+        except Exception as e:
+            print(f"❌ Ошибка при получении cookies через браузер: {e}")
+            session = None
+        finally:
+            if browser_parser.driver:
+                try:
+                    browser_parser.close_driver()
+                except Exception as e:
+                    print(f"⚠️ Ошибка при закрытии браузера: {e}")
+                browser_parser.driver = None
+        
+        if not session:
+            return False
+        self.get_fetcher().set_identity(session['cookies'], session['user_agent'], session['proxy'])
+        return True
+    
+    def check_new_items_hybrid(self) -> List[Item]:
+        """
+        Гибридная проверка: cookies из браузера, загрузка страниц по HTTP
+        
+        Браузер запускается только когда сессии еще нет или на HTTP-запрос
+        пришла проверка на робота.
+        """
+        fetcher = self.get_fetcher()
+        if fetcher.identity is None and not self.bootstrap_session():
+            print("⚠️ Сессия браузера не получена, проверяю без cookies")
+        
+        new_items = self.check_new_items_requests()
+        
+        if fetcher.blocked_urls:
+            # Сессию раскрыли: получаем новую и один раз повторяем проверку
+            print("🔄 Сессия получила проверку, обновляю cookies через браузер")
+            fetcher.clear_identity()
+            if self.bootstrap_session():
+                new_items += self.check_new_items_requests()
+        
+        return new_items
+    
+    def learn_api_endpoints(self, searches: List[Dict]) -> bool:
+        """
+        Поиск эндпоинтов JSON API по запросам, которые браузер сделал во время поиска
+        
+        Браузер открывает выдачу каждого поиска (с его локацией, категорией и
+        ценой), из перехваченных запросов выбирается JSON-ответ с текстом
+        запроса в параметрах. Эндпоинты сохраняются в конфигурацию, а cookies
+        браузера передаются загрузчику.
+        
+        Args:
+            searches: Поиски, которые известные эндпоинты выразить не могут
+        
+        Returns:
+            True если найден хотя бы один эндпоинт
+        """
+        browser_parser = self.get_browser_parser()
+        learned = []
+        try:
+            if not browser_parser.driver:
+                browser_parser.init_driver()
+            for search in searches:
+                # Шаблон, найденный для предыдущего поиска, может подойти и этому
+                if learned and self.api_client.endpoint_for(search) in learned:
+                    continue
+                if not browser_parser.open_search(self.build_url(search)):
+                    continue
+                # Сортировка по дате делает тот же запрос к API, что и проверка
+                browser_parser.set_sort_by_date()
+                if not self.api_client.learn(browser_parser.get_api_responses(), search):
+                    print(f"⚠️ API для поиска не найден, он проверяется через HTML: {search.get('query') or search}")
+                    self._api_unlearnable.add(self.search_key(search))
+                    continue
+                learned.append(self.api_client.endpoints[0])
+                session = browser_parser.current_session()
+                self.get_fetcher().set_identity(session['cookies'], session['user_agent'], session['proxy'])
+        except Exception as e:
+            print(f"❌ Ошибка при поиске API через браузер: {e}")
+        finally:
+            if browser_parser.driver:
+                try:
+                    browser_parser.close_driver()
+                except Exception as e:
+                    print(f"⚠️ Ошибка при закрытии браузера: {e}")
+                browser_parser.driver = None
+        
+        if not learned:
+            return False
+        self.config['api_endpoints'] = self.api_client.endpoints
+        self.save_config(self.config, keys=['api_endpoints'])
+        return True
+    
+    def check_new_items_api(self) -> List[Item]:
+        """
+        Проверка через JSON API поиска: без HTML, DOM и браузера
+        
+        Для поисков, которые известные эндпоинты выразить не могут (другие
+        локация, категория или фильтры), эндпоинт находится через браузер.
+        Поиски, для которых API не нашелся, проверяются через HTML; если API
+        нет ни для одного поиска, проверка идет в гибридном режиме.
+        """
+        searches = self.get_searches()
+        unknown = [search for search in searches
+                   if self.api_client.endpoint_for(search) is None
+                   and self.search_key(search) not in self._api_unlearnable]
+        if unknown:
+            self.learn_api_endpoints(unknown)
+        api_searches = [search for search in searches if self.api_client.endpoint_for(search) is not None]
+        if not api_searches:
+            print("⚠️ API поиска не найден, проверяю через HTML")
+            return self.check_new_items_hybrid()
+        
+        new_items = self.check_new_items_requests(api=True)
+        
+        fetcher = self.get_fetcher()
+        if fetcher.blocked_urls:
+            # Cookies больше не действуют: находим API и сессию заново
+            print("🔄 API получил проверку, обновляю сессию через браузер")
+            fetcher.clear_identity()
+            if self.learn_api_endpoints(api_searches[:1]):
+                new_items += self.check_new_items_requests(api=True)
+        
+        return new_items
+    
+    def check_new_items_requests(self, api: bool = False) -> List[Item]:
+        """
+        Проверка новых объявлений через requests: все поиски загружаются параллельно
+        
+        Страницы, которые не изменились с прошлой проверки (ответ 304 или та же
+        последовательность ID), пропускаются без построения DOM и запросов к БД.
+        Если все объявления на странице новые, загружается следующая страница
+        (p=2..max_pages), пока не встретится уже виденное объявление.
+        
+        Args:
+            api: Загружать ответы JSON API вместо HTML страниц (поиски, которые
+                API выразить не может, все равно загружаются как HTML)
+        """
+        searches = self.get_searches()
+        max_pages = max(1, int(self.config.get('max_pages', self.MAX_PAGES)))
+        # Историю очистили (бот или setup_params.py): все поиски начинаются заново
+        if self._checked_urls and not self.get_stats().get('total_found'):
+            self.reset_search_state()
+        # Блокировки копятся за всю проверку: по ним hybrid и api обновляют сессию
+        self.get_fetcher().blocked_urls = set()
+        
+        # Одинаковые поиски (например, у разных подписчиков) загружаются один раз
+        groups = {}
+        for index, search in enumerate(searches):
+            groups.setdefault(self.search_key(search), []).append(index)
+        
+        items = []
+        fingerprints = {}
+        # URL -> (водяной знак после разбора, новые объявления страницы)
+        watermarks = {}
+        # Номер поиска -> объявления его выдачи (для рассылки по подписчикам)
+        search_items = {}
+        unchanged = 0
+        # ID с первой выдачи поиска сверх FIRST_RUN_NOTIFY: запоминаются без уведомлений
+        quiet_ids = set()
+        # Ключ поиска -> страница, которую нужно загрузить
+        pending = {key: 1 for key in groups}
+        while pending:
+            # Фильтры поиска, которые API выразить не может (или эндпоинт устарел
+            # посреди проверки), не теряются: такой поиск загружается как HTML
+            urls = {}
+            api_urls = []
+            for key, page in pending.items():
+                search = searches[groups[key][0]]
+                if api and self.api_client.endpoint_for(search) is not None:
+                    urls[key] = self.api_client.build_url(search, page)
+                    api_urls.append(urls[key])
+                else:
+                    urls[key] = self.build_url(search, page)
+            print(f"Проверяю URL ({len(urls)}): {', '.join(list(urls.values())[:3])}{' ...' if len(urls) > 3 else ''}")
+            
+            html_urls = [url for url in urls.values() if url not in api_urls]
+            pages = self.load_pages(html_urls) if html_urls else {}
+            if api_urls:
+                pages.update(self.load_pages(api_urls, api=True))
+            
+            next_pending = {}
+            for key, url in urls.items():
+                result = pages.get(url)
+                if result is None:
+                    print(f"Не удалось получить страницу: {url}")
+                    continue
+                
+                fingerprint = result['fingerprint']
+                if result['items'] is None or (fingerprint and self._page_fingerprints.get(url) == fingerprint):
+                    unchanged += 1
+                    continue
+                fingerprints[url] = fingerprint
+                
+                page_items = result['items']
+                items.extend(page_items)
+                for index in groups[key]:
+                    search_items.setdefault(index, []).extend(page_items)
+                watermark = result.get('watermark')
+                if watermark is not None:
+                    watermarks[url] = (watermark, page_items)
+                
+                # Первая выдача поиска (новый запрос, перезапуск, очистка истории)
+                # не листается: все объявления на ней новые, но это не всплеск
+                page = pending[key]
+                if page == 1 and url not in self._checked_urls:
+                    quiet_ids.update(item.get('id') for item in page_items[self.FIRST_RUN_NOTIFY:])
+                    continue
+                
+                # Выдача отсортирована от новых к старым: если на странице нет ни
+                # одного виденного объявления, часть новых ушла на следующую страницу
+                reached_seen = watermark is not None and watermark.matched
+                if (page_items and page < max_pages and not reached_seen
+                        and not self.has_seen_items(page_items)):
+                    next_pending[key] = page + 1
+            
+            pending = next_pending
+        
+        if unchanged:
+            print(f"Без изменений страниц: {unchanged}")
+        if not fingerprints:
+            print("Новых объявлений не найдено")
+            return []
+        
+        # Все страницы проверяются и сохраняются одной транзакцией
+        try:
+            new_items = self.add_found_items_bulk(items)
+            
+            # У каждого подписчика своя дедупликация: объявление, уже найденное
+            # по чужому поиску, для него все равно новое
+            general_ids = set()
+            by_subscriber = {}
+            for index, index_items in search_items.items():
+                subscriber = searches[index].get('subscriber')
+                if subscriber:
+                    by_subscriber.setdefault(str(subscriber), []).extend(index_items)
+                else:
+                    general_ids.update(item.get('id') for item in index_items)
+            subscriber_items = {
+                subscriber: self.add_subscriber_items(subscriber, subscriber_found)
+                for subscriber, subscriber_found in by_subscriber.items()
+            }
+        except Exception:
+            # Страницы не сохранены - в следующий раз загружаем и разбираем заново
+            for url in fingerprints:
+                self.get_fetcher().forget(url)
+            self.search_cache.invalidate(canonical_url(url) for url in fingerprints)
+            raise
+        
+        # Запоминаем отпечатки только после успешной записи
+        for url, fingerprint in fingerprints.items():
+            if fingerprint:
+                self._page_fingerprints[url] = fingerprint
+            else:
+                self._page_fingerprints.pop(url, None)
+        for url, (watermark, page_items) in watermarks.items():
+            self._watermarks[url] = watermark.advance(page_items)
+        self._checked_urls.update(fingerprints)
+        
+        new_items = [item for item in new_items
+                     if item.get('id') in general_ids and item.get('id') not in quiet_ids]
+        for item in new_items:
+            self.dispatch_notification(item)
+        # Объявления подписчиков уходят только через callback в их чаты и в
+        # результат не попадают: его показывает чат, запустивший проверку
+        subscriber_count = 0
+        for subscriber, subscriber_new in subscriber_items.items():
+            for item in subscriber_new:
+                self.dispatch_notification(item.copy(subscriber=subscriber))
+            subscriber_count += len(subscriber_new)
         
         if new_items:
             print(f"Найдено новых объявлений: {len(new_items)}")
         else:
             print("Новых объявлений не найдено")
+        if subscriber_count:
+            print(f"Отправлено подписчикам: {subscriber_count}")
         
         return new_items
     
-    def notify_new_item(self, item: Dict):
+    def notify_new_item(self, item: Item):
         """Уведомление о новом объявлении"""
         print("\n" + "="*60)
         print("НОВОЕ ОБЪЯВЛЕНИЕ!")
@@ -586,18 +1148,38 @@ class AvitoParser:
     
     def update_config(self, **kwargs):
         """Обновление параметров поиска"""
+        changed = set()
         if 'search_params' in kwargs:
             self.config['search_params'].update(kwargs['search_params'])
+            changed.add('search_params')
         else:
             for key, value in kwargs.items():
                 if key in self.config:
                     self.config[key] = value
+                    changed.add(key)
                 elif key in self.config.get('search_params', {}):
                     self.config['search_params'][key] = value
+                    changed.add('search_params')
         
-        self.save_config()
+        self.save_config(keys=sorted(changed))
         print("Конфигурация обновлена")
     
+    def reset_search_state(self):
+        """
+        Забыть обработанные выдачи (после очистки найденных объявлений)
+        
+        Иначе отпечатки и водяные знаки скрыли бы выдачу, а поиск считался бы
+        уже проверенным и листался на всю глубину.
+        """
+        urls = set(self._checked_urls) | set(self._page_fingerprints) | set(self._watermarks)
+        fetcher = self.get_fetcher()
+        for url in urls:
+            fetcher.forget(url)
+        self.search_cache.invalidate(canonical_url(url) for url in urls)
+        self._checked_urls.clear()
+        self._page_fingerprints.clear()
+        self._watermarks.clear()
+    
     def get_stats(self) -> Dict:
         """Получение статистики"""
         if self.use_db and self.db:
@@ -647,10 +1229,9 @@ def main():
     print(f"\nПарсер запущен. Проверка каждые {interval} минут(ы)")
     
     # Проверяем наличие прокси
-    import os
-    proxy = os.getenv('AVITO_PROXY', None)
-    if proxy:
-        print(f"🌐 Используется прокси: {proxy.split('@')[-1] if '@' in proxy else proxy}")
+    if len(parser.proxy_pool):
+        proxies = ', '.join(mask_proxy(proxy.url) for proxy in parser.proxy_pool.proxies)
+        print(f"🌐 Прокси в пуле ({len(parser.proxy_pool)}): {proxies}")
         print("💡 С прокси можно делать запросы каждую минуту безопасно")
     else:
         print("⚠️ Прокси не настроен - возможны блокировки IP")
@@ -672,6 +1253,10 @@ def main():
         # Закрываем браузер если открыт
         if parser.browser_parser and parser.browser_parser.driver:
             parser.browser_parser.close_driver()
+        if parser.fetcher:
+            parser.fetcher.close()
+        if parser.parse_pool:
+            parser.parse_pool.close()
         # При использовании БД сохранение происходит автоматически
 
 
@@ -0,0 +1,369 @@
+"""
+Офлайн-бенчмарк разбора страниц поиска (без браузера и сети)
+
+Разбирает сохраненные страницы (debug_page.html и benchmarks/pages/*.html) и
+синтетические страницы на тысячи объявлений всеми способами: JSON из страницы
+и DOM через каждый установленный бэкенд. Показывает объявления в секунду,
+p50/p99 времени на страницу и пик памяти, сравнивает с базовой линией.
+
+Память меряется двумя способами: tracemalloc видит только кучу Python, а
+прирост пикового RSS (отдельный процесс на каждый случай) учитывает и память
+C-библиотек вроде libxml2.
+
+Запуск:
+    python benchmark_parser.py                    # сравнить с benchmarks/baseline.json
+    python benchmark_parser.py --check-speed      # то же и скорость (на той же машине)
+    python benchmark_parser.py --update-baseline  # записать новую базовую линию
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+from bs4 import BeautifulSoup
+from avito_parser import AvitoParser
+from item import Item
+from json_state import extract_items
+from parser_backends import HAS_LXML, get_parser_backend
+
+try:
+    import resource
+except ImportError:
+    # Windows: пиковый RSS не меряется
+    resource = None
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BASE_DIR, 'benchmarks', 'pages')
+BASELINE_PATH = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')
+DEBUG_PAGE = os.path.join(BASE_DIR, 'debug_page.html')
+
+# Размеры синтетических страниц (объявлений)
+SYNTHETIC_SIZES = (1000, 2000)
+# Повторов разбора каждой страницы (но не дольше MAX_SECONDS_PER_CASE)
+REPEAT = 20
+MAX_SECONDS_PER_CASE = 5
+# Допустимое падение скорости относительно базовой линии (доля, только с --check-speed)
+TOLERANCE = 0.4
+
+
+def load_corpus(corpus_dir: str) -> Dict[str, str]:
+    """Сохраненные страницы поиска: имя -> HTML"""
+    pages = {}
+    if os.path.exists(DEBUG_PAGE):
+        with open(DEBUG_PAGE, 'r', encoding='utf-8') as f:
+            pages['debug_page'] = f.read()
+    if os.path.isdir(corpus_dir):
+        for name in sorted(os.listdir(corpus_dir)):
+            if name.endswith('.html'):
+                with open(os.path.join(corpus_dir, name), 'r', encoding='utf-8') as f:
+                    pages[os.path.splitext(name)[0]] = f.read()
+    return pages
+
+
+def synthetic_dom_page(template_html: str, count: int) -> Optional[str]:
+    """
+    Страница без JSON из count карточек, размноженных из настоящей выдачи
+    
+    ID в каждой копии заменяется на новый, чтобы объявления не совпадали.
+    """
+    soup = BeautifulSoup(template_html, 'html.parser')
+    cards = [(card.get('data-item-id'), str(card)) for card in soup.select('div[data-marker="item"]')]
+    cards = [(item_id, card) for item_id, card in cards if item_id]
+    if not cards:
+        return None
+    
+    body = []
+    for index in range(count):
+        item_id, card = cards[index % len(cards)]
+        body.append(card.replace(item_id, str(1_000_000_000 + index)))
+    return f'<html><body><div data-marker="catalog-serp">{"".join(body)}</div></body></html>'
+
+
+def synthetic_json_page(count: int) -> str:
+    """Страница с состоянием window.__initialData__ на count объявлений"""
+    items = [
+        {
+            'id': 2_000_000_000 + index,
+            'title': f'Куртка женская {index}',
+            'urlPath': f'/moskva/odezhda_obuv_aksessuary/kurtka_{2_000_000_000 + index}',
+            'priceDetailed': {'value': 1000 + index, 'string': f'{1000 + index} ₽'},
+            'location': {'name': 'Москва'},
+            'sortTimeStamp': 1_700_000_000_000 + index * 1000,
+            'images': [{'208x156': f'https://img.example/{index}-s.jpg', '636x476': f'https://img.example/{index}.jpg'}],
+        }
+        for index in range(count)
+    ]
+    state = quote(json.dumps({'catalog': {'items': items}}, ensure_ascii=False))
+    return f'<html><head><script>window.__initialData__ = "{state}";</script></head><body></body></html>'
+
+
+def checksum(items: List[Dict]) -> str:
+    """
+    Отпечаток результата разбора
+    
+    Без found_at (меняется при каждом запуске); время публикации берется в
+    секундах эпохи, а не строкой местного времени, чтобы отпечаток не зависел
+    от часового пояса машины.
+    """
+    stable = []
+    for item in items:
+        fields = {key: value for key, value in item.items() if key not in ('found_at', 'published_at')}
+        fields['published_ts'] = Item.from_dict(item).published_ts
+        stable.append(fields)
+    data = json.dumps(stable, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def reset_peak_rss():
+    """Сброс пика RSS до текущего значения (только Linux, иначе ничего не делает)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def max_rss_kb() -> Optional[int]:
+    """Пиковый RSS процесса (КБ) или None, если его не измерить"""
+    # VmHWM сбрасывается reset_peak_rss, ru_maxrss - нет
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # На macOS ru_maxrss в байтах, на Linux - в килобайтах
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def make_parser() -> AvitoParser:
+    """Парсер без БД и браузера; статистику селекторов бенчмарк не сохраняет"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = AvitoParser(config_path=os.path.join(BASE_DIR, 'benchmarks', 'config.json'),
+                             use_db=False, use_browser=False)
+    parser.selectors.on_change = None
+    return parser
+
+
+def rss_worker(method_name: str, html: str) -> Optional[int]:
+    """Прирост пикового RSS за один разбор (выполняется в свежем процессе)"""
+    backends = [method_name.split(':', 1)[1]] if method_name.startswith('dom:') else []
+    parse = build_methods(make_parser(), backends)[method_name]
+    # Без сброса пик уже включает импорт модулей и передачу страницы в процесс
+    reset_peak_rss()
+    before = max_rss_kb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse(html)
+    return max_rss_kb() - before
+
+
+def measure_rss(cases: Dict[str, tuple]) -> Dict[str, Optional[int]]:
+    """
+    Прирост пикового RSS для каждого случая
+    
+    Каждый случай разбирается в новом процессе (maxtasksperchild=1), чтобы
+    на замер не влияли память и кэши предыдущих случаев.
+    
+    Args:
+        cases: Случай -> (способ разбора, HTML)
+    
+    Returns:
+        Случай -> КБ (None, если RSS не меряется на этой платформе)
+    """
+    if max_rss_kb() is None or not cases:
+        return {case: None for case in cases}
+    with multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+        return dict(zip(cases, pool.starmap(rss_worker, cases.values(), chunksize=1)))
+
+
+def measure(parse: Callable[[str], Optional[List[Dict]]], html: str, repeat: int) -> Optional[Dict]:
+    """
+    Замер одного способа разбора на одной странице
+    
+    Returns:
+        Метрики или None, если способ к странице не применим (нет JSON или объявлений)
+    """
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        # Прогрев (кэш селекторов) заодно замеряет пик кучи Python
+        tracemalloc.start()
+        items = parse(html)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if not items:
+            return None
+        
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            parse(html)
+            timings.append(time.perf_counter() - started)
+            # Медленные случаи (bs4 на тысячах объявлений) не гоняем бесконечно
+            if sum(timings) > MAX_SECONDS_PER_CASE:
+                break
+    
+    total = sum(timings)
+    return {
+        'items': len(items),
+        'items_per_sec': round(len(items) * len(timings) / total) if total else 0,
+        'p50_ms': round(percentile(timings, 0.5) * 1000, 2),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+        'heap_kb': round(peak / 1024),
+        'checksum': checksum(items),
+    }
+
+
+def build_methods(parser: AvitoParser, backends: List[str]) -> Dict[str, Callable]:
+    """Способы разбора: JSON из страницы и DOM через каждый бэкенд"""
+    methods = {'json': extract_items}
+    for name in backends:
+        backend = get_parser_backend(name)
+        methods[f'dom:{name}'] = lambda html, backend=backend: parser.parse_items(backend.parse(html), 0)
+    return methods
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], methods: List[str],
+            tolerance: Optional[float] = None) -> List[str]:
+    """
+    Регрессии относительно базовой линии
+    
+    По умолчанию сравнивается только результат разбора (отпечаток и число
+    объявлений): скорость базовой линии снята на одной машине, и на другом
+    железе или в CI сравнение с ней срабатывало бы случайно.
+    
+    Args:
+        methods: Способы разбора этого запуска (случаи остальных способов не сравниваются)
+        tolerance: Допустимое падение скорости (None - скорость не сравнивается)
+    """
+    problems = []
+    measured_pages = {case.split('/')[0] for case in results}
+    for case, expected in baseline.items():
+        if case.split('/', 1)[1] not in methods:
+            continue
+        actual = results.get(case)
+        if actual is None:
+            # Страница разбиралась, но этот способ ничего не нашел
+            if case.split('/')[0] in measured_pages:
+                problems.append(f"{case}: объявления больше не находятся")
+            continue
+        if actual['items'] != expected.get('items') or actual['checksum'] != expected.get('checksum'):
+            problems.append(f"{case}: результат разбора изменился ({expected.get('items')} -> {actual['items']} объявлений)")
+        if tolerance is None:
+            continue
+        expected_speed = expected.get('items_per_sec') or 0
+        if expected_speed and actual['items_per_sec'] < expected_speed * (1 - tolerance):
+            problems.append(f"{case}: медленнее базовой линии ({expected_speed} -> {actual['items_per_sec']} объявлений/с)")
+    return problems
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser(description='Бенчмарк разбора страниц поиска Авито')
+    arg_parser.add_argument('--corpus', default=CORPUS_DIR, help='Папка с сохраненными страницами (*.html)')
+    arg_parser.add_argument('--sizes', default=','.join(map(str, SYNTHETIC_SIZES)),
+                            help='Размеры синтетических страниц через запятую (0 - без них)')
+    arg_parser.add_argument('--repeat', type=int, default=REPEAT, help='Повторов на страницу')
+    arg_parser.add_argument('--backends', default='bs4,lxml' if HAS_LXML else 'bs4', help='Бэкенды DOM через запятую')
+    arg_parser.add_argument('--baseline', default=BASELINE_PATH, help='Файл базовой линии')
+    arg_parser.add_argument('--update-baseline', action='store_true', help='Записать результаты как базовую линию')
+    arg_parser.add_argument('--check-speed', action='store_true',
+                            help='Сравнивать и скорость (базовая линия снята на этой же машине)')
+    arg_parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                            help='Допустимое падение скорости с --check-speed (доля)')
+    args = arg_parser.parse_args()
+    
+    # Даты без часового пояса (validFrom в ld+json) читаются в местном времени:
+    # фиксируем пояс, чтобы отпечаток не зависел от машины
+    os.environ['TZ'] = 'UTC'
+    if hasattr(time, 'tzset'):
+        time.tzset()
+    
+    parser = make_parser()
+    
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print("❌ Нет страниц для разбора: нужен debug_page.html или файлы в benchmarks/pages")
+        return 1
+    template = next(iter(pages.values()))
+    for size in (int(value) for value in args.sizes.split(',') if value.strip()):
+        if size <= 0:
+            continue
+        dom_page = synthetic_dom_page(template, size)
+        if dom_page:
+            pages[f'synthetic_dom_{size}'] = dom_page
+        pages[f'synthetic_json_{size}'] = synthetic_json_page(size)
+    
+    methods = build_methods(parser, [name.strip() for name in args.backends.split(',') if name.strip()])
+    
+    print(f"📊 Страниц: {len(pages)}, способов: {', '.join(methods)}, повторов: {args.repeat}")
+    results = {}
+    cases = {}
+    for page_name, html in pages.items():
+        checksums = {}
+        for method_name, parse in methods.items():
+            metrics = measure(parse, html, args.repeat)
+            if metrics is None:
+                continue
+            case = f'{page_name}/{method_name}'
+            results[case] = metrics
+            cases[case] = (method_name, html)
+            if method_name.startswith('dom:'):
+                checksums[method_name] = metrics['checksum']
+        if len(set(checksums.values())) > 1:
+            print(f"⚠️ {page_name}: бэкенды DOM дали разный результат: {checksums}")
+    
+    # Куча Python не включает память libxml2: пиковый RSS меряется отдельно
+    for case, rss_kb in measure_rss(cases).items():
+        results[case]['rss_kb'] = rss_kb
+    
+    print(f"{'случай':<40} {'объявл.':>8} {'объявл./с':>11} {'p50, мс':>9} {'p99, мс':>9} "
+          f"{'куча, КБ':>9} {'RSS, КБ':>9}")
+    for case, metrics in results.items():
+        rss = '-' if metrics['rss_kb'] is None else metrics['rss_kb']
+        print(f"{case:<40} {metrics['items']:>8} {metrics['items_per_sec']:>11} "
+              f"{metrics['p50_ms']:>9} {metrics['p99_ms']:>9} {metrics['heap_kb']:>9} {rss:>9}")
+    
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"💾 Базовая линия записана: {args.baseline}")
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        print("ℹ️ Базовой линии нет, запустите с --update-baseline")
+        return 0
+    
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    problems = compare(results, baseline, list(methods), args.tolerance if args.check_speed else None)
+    if problems:
+        print("❌ Регрессии:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("✅ Регрессий относительно базовой линии нет")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
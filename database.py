@@ -3,12 +3,131 @@
 """
 import sqlite3
 import json
+import threading
+from contextlib import contextmanager
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import re
+import copy
+import hashlib
+from seen_cache import SeenIdCache
+from item import Item, parse_id, parse_price, to_timestamp
+
+
+# Часто выполняемые запросы держим в константах: модуль sqlite3 кэширует
+# подготовленные выражения по тексту SQL, поэтому текст должен совпадать
+SQL_IS_ITEM_FOUND = 'SELECT 1 FROM found_items WHERE item_id = ?'
+SQL_INSERT_FOUND_ITEM = '''
+    INSERT OR IGNORE INTO found_items (item_id, item_ref, title, price, price_value, description, link, found_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+# RETURNING появился в SQLite 3.35, на старых версиях смотрим на rowcount
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+if SUPPORTS_RETURNING:
+    SQL_INSERT_FOUND_ITEM += 'RETURNING item_id'
+SQL_INSERT_NEW_ITEM = '''
+    INSERT INTO new_items (item_id, title, price, price_value, description, link, found_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+# Исходный строковый ID объявления из found_items
+SQL_ITEM_ID_TEXT = 'COALESCE(item_ref, CAST(item_id AS TEXT))'
+SQL_GET_CONFIG_VERSION = "SELECT value FROM counters WHERE key = 'config_version'"
+SQL_SET_CONFIG = '''
+    INSERT OR REPLACE INTO config (key, value, updated_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+'''
+
+
+def encode_config_value(value: any) -> str:
+    """Преобразование значения конфигурации в строку для хранения"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def decode_config_value(value_str: str) -> any:
+    """Обратное преобразование: JSON, а если не получилось - строка как есть"""
+    try:
+        return json.loads(value_str)
+    except:
+        return value_str
+
+
+def item_key(item_id) -> int:
+    """
+    Целочисленный ключ объявления для found_items
+    
+    Числовые ID Авито используются как есть. Нечисловые (например md5-хеш
+    ссылки из браузерного парсера) отображаются в отрицательные числа,
+    чтобы не пересекаться с настоящими ID.
+    """
+    item_id = parse_id(item_id)
+    if isinstance(item_id, int):
+        return item_id
+    digest = hashlib.blake2b(item_id.encode('utf-8'), digest_size=8).digest()
+    return -(int.from_bytes(digest, 'big') >> 1) - 1
+
+
+def item_ref(item_id) -> Optional[str]:
+    """
+    Исходный ID, который нужно хранить рядом с ключом
+    
+    Returns:
+        None для числовых ID (восстанавливаются из ключа), иначе сам ID
+    """
+    item_id = parse_id(item_id)
+    if isinstance(item_id, int):
+        return None
+    return item_id
+
+
+def item_from_row(row: sqlite3.Row) -> Item:
+    """Объявление из строки found_items / new_items"""
+    return Item(
+        row['item_id'],
+        title=row['title'],
+        price_value=row['price_value'],
+        price_text=row['price'],
+        description=row['description'],
+        link=row['link'],
+        found_ts=to_timestamp(row['found_at']),
+    )
 
 
 class Database:
+    # Версии схемы по порядку: (PRAGMA user_version, метод миграции)
+    MIGRATIONS = [
+        (1, '_migration_initial_schema'),
+        (2, '_migration_integer_item_keys'),
+        (3, '_migration_stats_counters'),
+        (4, '_migration_config_version'),
+        (5, '_migration_price_value'),
+        (6, '_migration_fulltext_search'),
+        (7, '_migration_subscriber_items'),
+    ]
+    
+    # Сроки хранения по таблицам в днях (0 - хранить бессрочно).
+    # Переопределяются ключом конфигурации 'retention'.
+    # found_items и subscriber_items - история дедупликации: после удаления
+    # поднятое старое объявление снова пришло бы как новое, поэтому по
+    # умолчанию они хранятся всегда
+    DEFAULT_RETENTION = {
+        'found_items_days': 0,
+        'new_items_days': 30,
+        'subscriber_items_days': 0,
+    }
+    # Ограничения работы обслуживания за один тик
+    MAINTENANCE_BATCH_ROWS = 1000
+    MAINTENANCE_ROLLUP_DAYS = 7
+    MAINTENANCE_VACUUM_PAGES = 200
+    MAINTENANCE_INTERVAL_SECONDS = 600
+    
+    # Сколько ждать освобождения блокировки другим соединением (мс)
+    BUSY_TIMEOUT_MS = 10000
+    # Размер кэша подготовленных выражений на одно соединение
+    CACHED_STATEMENTS = 128
+
     def __init__(self, db_path: str = None):
         """
         Инициализация базы данных
@@ -24,23 +143,185 @@ class Database:
                 self.db_path = os.path.join(os.getcwd(), "avito_parser.db")
         else:
             self.db_path = db_path
-        self.init_database()
-    
-    def get_connection(self):
-        """Получение соединения с базой данных"""
-        # Создаем директорию если её нет
+        
+        # Пул соединений: одно постоянное соединение на поток
+        self._local = threading.local()
+        self._connections = {}  # ident потока -> (поток, соединение)
+        self._pool_lock = threading.Lock()
+        
+        # Кэш конфигурации и версия, с которой он загружен
+        self._config_cache = None
+        self._config_version = None
+        self._config_lock = threading.Lock()
+        
+        # Наличие индекса FTS5 (проверяется при первом поиске)
+        self._has_fts = None
+        
+        # Фоновое обслуживание (retention, rollup, vacuum)
+        self._maintenance_thread = None
+        self._maintenance_stop = threading.Event()
+        
+        # Создаем директорию один раз, а не при каждом соединении
         db_dir = os.path.dirname(self.db_path)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
+        
+        self.init_database()
+        
+        # Кэш виденных ID перед таблицей found_items
+        self.seen_cache = SeenIdCache()
+        self.warm_seen_cache()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Открытие нового соединения с настройками для конкурентной работы"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.BUSY_TIMEOUT_MS / 1000,
+            isolation_level=None,  # Транзакциями управляем сами через transaction()
+            check_same_thread=False,  # Нужно только для close() из другого потока
+            cached_statements=self.CACHED_STATEMENTS
+        )
         conn.row_factory = sqlite3.Row  # Для удобного доступа к колонкам по имени
+        
+        # WAL: читатели не блокируют писателя и наоборот
+        conn.execute('PRAGMA journal_mode=WAL')
+        # В режиме WAL NORMAL безопасен и не делает fsync на каждый коммит
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        
+        # Функции для использования прямо в SQL (миграции)
+        conn.create_function('parse_price', 1, parse_price, deterministic=True)
+        conn.create_function('item_key', 1, item_key, deterministic=True)
+        conn.create_function('item_ref', 1, item_ref, deterministic=True)
         return conn
     
-    def init_database(self):
-        """Инициализация структуры базы данных"""
+    def get_connection(self) -> sqlite3.Connection:
+        """
+        Получение соединения с базой данных
+        
+        Соединение создается один раз для каждого потока и переиспользуется,
+        поэтому закрывать его после запроса не нужно.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.depth = 0
+        
+        current = threading.current_thread()
+        with self._pool_lock:
+            # Закрываем соединения потоков, которые уже завершились
+            for ident, (thread, old_conn) in list(self._connections.items()):
+                if not thread.is_alive():
+                    try:
+                        old_conn.close()
+                    except sqlite3.Error:
+                        pass
+                    del self._connections[ident]
+            self._connections[current.ident] = (current, conn)
+        
+        return conn
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Транзакция на запись
+        
+        Использует BEGIN IMMEDIATE, чтобы блокировка на запись бралась сразу,
+        а не при первом изменении (иначе параллельные писатели получают
+        "database is locked" без ожидания). Вложенные вызовы выполняются
+        внутри внешней транзакции.
+        
+        Yields:
+            Курсор для выполнения запросов
+        """
+        conn = self.get_connection()
+        if self._local.depth > 0:
+            self._local.depth += 1
+            try:
+                yield conn.cursor()
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn.execute('BEGIN IMMEDIATE')
+        self._local.depth = 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            self._local.depth = 0
+            conn.execute('ROLLBACK')
+            raise
+        self._local.depth = 0
+        conn.execute('COMMIT')
+    
+    def close(self):
+        """Закрытие всех соединений пула"""
+        self.stop_maintenance()
+        with self._pool_lock:
+            for thread, conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+    
+    def _enable_incremental_vacuum(self):
+        """
+        Включение auto_vacuum=INCREMENTAL
+        
+        Режим применяется к уже созданному файлу только после VACUUM,
+        это делается один раз. VACUUM требует монопольного доступа: если базу
+        держит другой процесс (второй бот, setup_params.py), перестройка
+        откладывается до следующего запуска, а режим остается прежним.
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+            return
+        
+        conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        # Миграции уже создали таблицы, поэтому о перестройке сообщаем, только
+        # если в базе есть данные
+        has_data = conn.execute('SELECT 1 FROM found_items LIMIT 1').fetchone()
+        if has_data:
+            print("🔧 Перестраиваю базу для auto_vacuum=INCREMENTAL (однократно)...")
+        # Для пустой базы VACUUM мгновенный, но тоже нужен: таблицы уже созданы
+        try:
+            conn.execute('VACUUM')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ Перестройка базы отложена до следующего запуска: {e}")
+    
+    def init_database(self):
+        """Инициализация структуры базы данных и применение миграций"""
+        self.migrate()
+    
+    def get_schema_version(self) -> int:
+        """Текущая версия схемы (PRAGMA user_version)"""
+        return self.get_connection().execute('PRAGMA user_version').fetchone()[0]
+    
+    def migrate(self):
+        """Применение недостающих миграций, каждая в своей транзакции"""
+        for version, method_name in self.MIGRATIONS:
+            if self.get_schema_version() >= version:
+                continue
+            
+            with self.transaction() as cursor:
+                # Перепроверяем под блокировкой: миграцию мог применить другой процесс
+                if cursor.execute('PRAGMA user_version').fetchone()[0] >= version:
+                    continue
+                getattr(self, method_name)(cursor)
+                cursor.execute(f'PRAGMA user_version = {int(version)}')
+            print(f"🔧 Схема БД обновлена до версии {version}")
         
+        # VACUUM не выполняется внутри транзакции, поэтому идет после миграций
+        self._enable_incremental_vacuum()
+    
+    def _migration_initial_schema(self, cursor: sqlite3.Cursor):
+        """Версия 1: исходная схема"""
         # Таблица для найденных объявлений
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS found_items (
@@ -78,6 +359,18 @@ class Database:
             )
         ''')
         
+        # Дневные сводки по объявлениям (заполняются перед удалением старых)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_stats (
+                day TEXT PRIMARY KEY,
+                items_count INTEGER NOT NULL,
+                price_count INTEGER NOT NULL,
+                price_sum INTEGER,
+                price_min INTEGER,
+                price_max INTEGER
+            )
+        ''')
+        
         # Индексы для ускорения поиска
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_item_id ON found_items(item_id)
@@ -90,241 +383,765 @@ class Database:
         cursor.execute('''
             CREATE INDEX IF NOT EXISTS idx_new_items_at ON new_items(found_at)
         ''')
+    
+    def _migration_integer_item_keys(self, cursor: sqlite3.Cursor):
+        """
+        Версия 2: found_items с целочисленным ключом в таблице WITHOUT ROWID
         
-        conn.commit()
-        conn.close()
+        Первичный ключ item_id сам является индексом, поэтому суррогатный
+        AUTOINCREMENT id и отдельный idx_item_id больше не нужны.
+        Нечисловые ID хранятся в item_ref.
+        """
+        cursor.execute('''
+            CREATE TABLE found_items_v2 (
+                item_id INTEGER PRIMARY KEY,
+                item_ref TEXT,
+                title TEXT,
+                price TEXT,
+                description TEXT,
+                link TEXT,
+                found_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                notified BOOLEAN DEFAULT 0
+            ) WITHOUT ROWID
+        ''')
+        
+        cursor.execute('''
+            INSERT OR IGNORE INTO found_items_v2
+                (item_id, item_ref, title, price, description, link, found_at, notified)
+            SELECT item_key(item_id), item_ref(item_id), title, price, description, link, found_at, notified
+            FROM found_items
+        ''')
+        
+        # Вместе с таблицей удаляются idx_item_id и idx_found_at
+        cursor.execute('DROP TABLE found_items')
+        cursor.execute('ALTER TABLE found_items_v2 RENAME TO found_items')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_found_at ON found_items(found_at)
+        ''')
     
-    def is_item_found(self, item_id: str) -> bool:
-        """Проверка, найдено ли объявление ранее"""
+    def _migration_stats_counters(self, cursor: sqlite3.Cursor):
+        """
+        Версия 3: счетчики статистики, которые ведут триггеры
+        
+        get_stats читает готовые значения по первичному ключу вместо
+        COUNT(*) по растущим таблицам.
+        """
+        # Общие счетчики: total_found, last_found_at
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS counters (
+                key TEXT PRIMARY KEY,
+                value
+            ) WITHOUT ROWID
+        ''')
+        
+        # Количество новых объявлений по часам (для "новых за 24ч")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hourly_new_items (
+                hour TEXT PRIMARY KEY,
+                new_count INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        
+        # Заполняем текущими значениями
+        cursor.execute('''
+            INSERT OR REPLACE INTO counters (key, value)
+            VALUES ('total_found', (SELECT COUNT(*) FROM found_items)),
+                   ('last_found_at', (SELECT MAX(found_at) FROM found_items))
+        ''')
+        cursor.execute('''
+            INSERT OR REPLACE INTO hourly_new_items (hour, new_count)
+            SELECT strftime('%Y-%m-%d %H', found_at) AS hour, COUNT(*)
+            FROM new_items
+            WHERE found_at >= strftime('%Y-%m-%d', 'now', 'localtime', '-2 days')
+              AND hour IS NOT NULL
+            GROUP BY hour
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_found_items_insert
+            AFTER INSERT ON found_items
+            BEGIN
+                UPDATE counters SET value = value + 1 WHERE key = 'total_found';
+                UPDATE counters SET value = NEW.found_at
+                WHERE key = 'last_found_at' AND (value IS NULL OR value < NEW.found_at);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_found_items_delete
+            AFTER DELETE ON found_items
+            BEGIN
+                UPDATE counters SET value = value - 1 WHERE key = 'total_found';
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_new_items_insert
+            AFTER INSERT ON new_items
+            BEGIN
+                INSERT INTO hourly_new_items (hour, new_count)
+                VALUES (COALESCE(strftime('%Y-%m-%d %H', NEW.found_at),
+                                 strftime('%Y-%m-%d %H', 'now', 'localtime')), 1)
+                ON CONFLICT(hour) DO UPDATE SET new_count = new_count + 1;
+            END
+        ''')
+    
+    def _migration_config_version(self, cursor: sqlite3.Cursor):
+        """
+        Версия 4: счетчик версии конфигурации
+        
+        Триггеры увеличивают config_version при любом изменении таблицы config,
+        в том числе из другого процесса (setup_params.py, второй бот).
+        """
+        cursor.execute('''
+            INSERT OR IGNORE INTO counters (key, value) VALUES ('config_version', 0)
+        ''')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_config_{event.lower()}
+                AFTER {event} ON config
+                BEGIN
+                    UPDATE counters SET value = value + 1 WHERE key = 'config_version';
+                END
+            ''')
+    
+    def _migration_price_value(self, cursor: sqlite3.Cursor):
+        """Версия 5: числовая цена в рублях с индексом для фильтров по диапазону"""
+        for table in ('found_items', 'new_items'):
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN price_value INTEGER')
+            # Заполняем для уже сохраненных объявлений
+            cursor.execute(f'UPDATE {table} SET price_value = parse_price(price)')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_price_value ON found_items(price_value)
+        ''')
+    
+    def _migration_fulltext_search(self, cursor: sqlite3.Cursor):
+        """
+        Версия 6: полнотекстовый индекс FTS5 по title/description
+        
+        Таблица без содержимого (content=''): текст хранится только в found_items,
+        rowid индекса совпадает с item_id. Индекс ведут триггеры. Если SQLite
+        собран без FTS5, миграция ничего не создает и поиск идет через LIKE.
+        """
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+                    title, description,
+                    content='',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ FTS5 недоступен, поиск будет через LIKE: {e}")
+            return
+        
+        cursor.execute('''
+            INSERT INTO items_fts (rowid, title, description)
+            SELECT item_id, COALESCE(title, ''), COALESCE(description, '') FROM found_items
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_found_items_fts_insert
+            AFTER INSERT ON found_items
+            BEGIN
+                INSERT INTO items_fts (rowid, title, description)
+                VALUES (NEW.item_id, COALESCE(NEW.title, ''), COALESCE(NEW.description, ''));
+            END
+        ''')
+        # Из индекса без содержимого удаляют, передавая старые значения колонок
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_found_items_fts_delete
+            AFTER DELETE ON found_items
+            BEGIN
+                INSERT INTO items_fts (items_fts, rowid, title, description)
+                VALUES ('delete', OLD.item_id, COALESCE(OLD.title, ''), COALESCE(OLD.description, ''));
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_found_items_fts_update
+            AFTER UPDATE OF title, description ON found_items
+            BEGIN
+                INSERT INTO items_fts (items_fts, rowid, title, description)
+                VALUES ('delete', OLD.item_id, COALESCE(OLD.title, ''), COALESCE(OLD.description, ''));
+                INSERT INTO items_fts (rowid, title, description)
+                VALUES (NEW.item_id, COALESCE(NEW.title, ''), COALESCE(NEW.description, ''));
+            END
+        ''')
+    
+    def _migration_subscriber_items(self, cursor: sqlite3.Cursor):
+        """
+        Версия 7: какие объявления уже отправлены каждому подписчику
+        
+        Одинаковые поиски разных подписчиков загружаются один раз, а
+        повторные уведомления отсекаются отдельно для каждого подписчика.
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS subscriber_items (
+                subscriber TEXT NOT NULL,
+                item_id INTEGER NOT NULL,
+                found_at TEXT NOT NULL,
+                PRIMARY KEY (subscriber, item_id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_subscriber_items_found_at ON subscriber_items(found_at)')
+    
+    def has_fulltext_index(self) -> bool:
+        """Есть ли в базе индекс FTS5"""
+        if self._has_fts is None:
+            row = self.get_connection().execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'"
+            ).fetchone()
+            self._has_fts = row is not None
+        return self._has_fts
+    
+    def warm_seen_cache(self):
+        """Прогрев кэша виденных ID из found_items"""
         conn = self.get_connection()
-        cursor = conn.cursor()
+        self._local.seen_data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        cursor = conn.execute(f'SELECT {SQL_ITEM_ID_TEXT} FROM found_items ORDER BY found_at')
+        self.seen_cache.reset(row[0] for row in cursor)
+    
+    def _sync_seen_cache(self):
+        """
+        Прогрев кэша заново, если базу изменило другое соединение
         
-        cursor.execute('SELECT 1 FROM found_items WHERE item_id = ?', (item_id,))
-        result = cursor.fetchone() is not None
+        Иначе ID, добавленные вторым ботом или setup_params.py, до перезапуска
+        оставались бы для Bloom-фильтра "точно не виденными". Как и у кэша
+        конфигурации, проверка идет по PRAGMA data_version без обращения к диску.
+        """
+        conn = self.get_connection()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if getattr(self._local, 'seen_data_version', None) != data_version:
+            self.warm_seen_cache()
+    
+    def is_item_found(self, item_id: str) -> bool:
+        """Проверка, найдено ли объявление ранее"""
+        item_id = str(item_id)
+        self._sync_seen_cache()
+        # Bloom-фильтр: отрицательный ответ без обращения к базе
+        if not self.seen_cache.might_contain(item_id):
+            return False
+        if self.seen_cache.is_recent(item_id):
+            return True
         
-        conn.close()
-        return result
+        # Вероятное попадание проверяем по индексу
+        conn = self.get_connection()
+        found = conn.execute(SQL_IS_ITEM_FOUND, (item_key(item_id),)).fetchone() is not None
+        if found:
+            self.seen_cache.add(item_id)
+        return found
     
-    def add_found_item(self, item: Dict) -> bool:
+    def add_found_item(self, item: Item) -> bool:
         """
         Добавление найденного объявления
         
         Args:
-            item: Словарь с данными объявления (id, title, price, description, link)
+            item: Объявление (Item или словарь с id, title, price, description, link)
         
         Returns:
             True если объявление новое (добавлено), False если уже было
         """
-        item_id = item.get('id')
-        if not item_id:
-            return False
+        return bool(self.add_found_items_bulk([item]))
+    
+    def add_found_items_bulk(self, items: List[Item]) -> List[Item]:
+        """
+        Добавление целой страницы объявлений одной транзакцией
         
-        # Проверяем, есть ли уже такое объявление
-        if self.is_item_found(item_id):
-            return False
+        Дубликаты отсекает сама база (INSERT OR IGNORE по уникальному item_id),
+        поэтому отдельная проверка is_item_found не нужна.
         
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        Args:
+            items: Объявления (Item или словари с id, title, price, description, link)
         
-        try:
-            cursor.execute('''
-                INSERT INTO found_items (item_id, title, price, description, link, found_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                item_id,
-                item.get('title', ''),
-                item.get('price', ''),
-                item.get('description', ''),
-                item.get('link', ''),
-                item.get('found_at', datetime.now().isoformat())
-            ))
-            
-            # Также добавляем в таблицу новых объявлений
-            cursor.execute('''
-                INSERT INTO new_items (item_id, title, price, description, link, found_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                item_id,
-                item.get('title', ''),
-                item.get('price', ''),
-                item.get('description', ''),
-                item.get('link', ''),
-                item.get('found_at', datetime.now().isoformat())
-            ))
-            
-            conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            # Объявление уже существует
-            conn.rollback()
-            return False
-        finally:
-            conn.close()
+        Returns:
+            Только действительно новые объявления, в исходном порядке
+        """
+        # Отбрасываем объявления без ID и повторы внутри самой страницы
+        candidates = []
+        seen_ids = set()
+        for item in items:
+            if not item.get('id'):
+                continue
+            item = Item.from_dict(item)
+            item_id = str(item.id)
+            if item_id in seen_ids:
+                continue
+            seen_ids.add(item_id)
+            # Недавно виденные отсекаем без обращения к базе
+            if self.seen_cache.is_recent(item_id):
+                continue
+            candidates.append(item)
+        
+        if not candidates:
+            return []
+        
+        new_items = []
+        with self.transaction() as cursor:
+            for item in candidates:
+                # Строки для показа (цена, время) строятся только здесь
+                row = (
+                    item.title,
+                    item.price,
+                    item.price_value,
+                    item.description,
+                    item.link,
+                    item.found_at
+                )
+                cursor.execute(SQL_INSERT_FOUND_ITEM, (item_key(item.id), item_ref(item.id)) + row)
+                if SUPPORTS_RETURNING:
+                    inserted = cursor.fetchone() is not None
+                else:
+                    inserted = cursor.rowcount == 1
+                
+                if inserted:
+                    # Также добавляем в таблицу новых объявлений
+                    cursor.execute(SQL_INSERT_NEW_ITEM, (str(item.id),) + row)
+                    new_items.append(item)
+        
+        # Кэш обновляем только после успешного коммита
+        for item in candidates:
+            self.seen_cache.add(str(item.id))
+        if self.seen_cache.overfilled:
+            self.warm_seen_cache()
+        
+        return new_items
     
-    def get_found_items(self, limit: int = 100) -> List[Dict]:
-        """Получение списка найденных объявлений"""
+    def has_subscriber_items(self, subscriber: str) -> bool:
+        """Получал ли подписчик уже хоть одно объявление"""
         conn = self.get_connection()
-        cursor = conn.cursor()
+        cursor = conn.execute('SELECT 1 FROM subscriber_items WHERE subscriber = ? LIMIT 1', (str(subscriber),))
+        return cursor.fetchone() is not None
+    
+    def add_subscriber_items(self, subscriber: str, items: List[Item]) -> List[Item]:
+        """
+        Отметка объявлений как отправленных подписчику
         
-        cursor.execute('''
-            SELECT item_id, title, price, description, link, found_at
+        Args:
+            subscriber: Идентификатор подписчика (например chat_id)
+            items: Объявления из выдачи его поисков
+        
+        Returns:
+            Объявления, которых подписчик еще не получал, в исходном порядке
+        """
+        new_items = []
+        now = datetime.now().isoformat()
+        with self.transaction() as cursor:
+            for item in items:
+                item_id = item.get('id')
+                if not item_id:
+                    continue
+                cursor.execute(
+                    'INSERT OR IGNORE INTO subscriber_items (subscriber, item_id, found_at) VALUES (?, ?, ?)',
+                    (str(subscriber), item_key(item_id), now)
+                )
+                if cursor.rowcount == 1:
+                    new_items.append(item)
+        return new_items
+    
+    def get_found_items(self, limit: int = 100, price_min: int = None, price_max: int = None) -> List[Item]:
+        """
+        Получение списка найденных объявлений
+        
+        Args:
+            limit: Максимум объявлений
+            price_min: Минимальная цена в рублях (фильтр выполняется в SQL по индексу)
+            price_max: Максимальная цена в рублях
+        """
+        where, params = self._price_filter(price_min, price_max)
+        conn = self.get_connection()
+        cursor = conn.execute(f'''
+            SELECT {SQL_ITEM_ID_TEXT} AS item_id, title, price, price_value, description, link, found_at
             FROM found_items
+            {where}
             ORDER BY found_at DESC
             LIMIT ?
-        ''', (limit,))
+        ''', params + [limit])
         
-        items = []
-        for row in cursor.fetchall():
-            items.append({
-                'id': row['item_id'],
-                'title': row['title'],
-                'price': row['price'],
-                'description': row['description'],
-                'link': row['link'],
-                'found_at': row['found_at']
-            })
-        
-        conn.close()
-        return items
-    
-    def get_new_items(self, limit: int = 50) -> List[Dict]:
-        """Получение последних новых объявлений"""
+        return [item_from_row(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _price_filter(price_min: Optional[int], price_max: Optional[int]):
+        """Условие WHERE по price_value и его параметры"""
+        conditions = []
+        params = []
+        if price_min not in (None, ''):
+            conditions.append('price_value >= ?')
+            params.append(parse_price(price_min))
+        if price_max not in (None, ''):
+            conditions.append('price_value <= ?')
+            params.append(parse_price(price_max))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+    
+    def get_price_stats(self, price_min: int = None, price_max: int = None) -> Dict:
+        """
+        Статистика цен найденных объявлений (считается в SQL)
+        
+        Returns:
+            Количество объявлений с ценой, минимальная, максимальная и средняя цена
+        """
+        where, params = self._price_filter(price_min, price_max)
+        if not where:
+            where = 'WHERE price_value IS NOT NULL'
         conn = self.get_connection()
-        cursor = conn.cursor()
+        row = conn.execute(f'''
+            SELECT COUNT(price_value) AS count, MIN(price_value) AS min,
+                   MAX(price_value) AS max, AVG(price_value) AS avg
+            FROM found_items
+            {where}
+        ''', params).fetchone()
         
-        cursor.execute('''
-            SELECT item_id, title, price, description, link, found_at
+        return {
+            'count': row['count'],
+            'min': row['min'],
+            'max': row['max'],
+            'avg': round(row['avg']) if row['avg'] is not None else None
+        }
+    
+    def search_items(self, query: str, limit: int = 20) -> List[Item]:
+        """
+        Полнотекстовый поиск по сохраненным объявлениям
+        
+        Все слова запроса должны встретиться в названии или описании
+        (допускается продолжение слова: "айфон" найдет "айфоны").
+        
+        Args:
+            query: Строка поиска
+            limit: Максимум результатов
+            
+        Returns:
+            Объявления, самые релевантные первыми
+        """
+        words = re.findall(r'\w+', query or '')
+        if not words:
+            return []
+        
+        conn = self.get_connection()
+        if self.has_fulltext_index():
+            # Каждое слово в кавычках - спецсимволы запроса FTS5 не интерпретируются
+            match = ' '.join(f'"{word}"*' for word in words)
+            cursor = conn.execute(f'''
+                SELECT {SQL_ITEM_ID_TEXT} AS item_id, f.title, f.price, f.price_value,
+                       f.description, f.link, f.found_at
+                FROM items_fts
+                JOIN found_items f ON f.item_id = items_fts.rowid
+                WHERE items_fts MATCH ?
+                ORDER BY items_fts.rank
+                LIMIT ?
+            ''', (match, limit))
+        else:
+            conditions = ' AND '.join(
+                "(title LIKE ? ESCAPE '\\' OR description LIKE ? ESCAPE '\\')" for _ in words
+            )
+            params = []
+            for word in words:
+                pattern = '%' + re.sub(r'([%_\\])', r'\\\1', word) + '%'
+                params.extend([pattern, pattern])
+            cursor = conn.execute(f'''
+                SELECT {SQL_ITEM_ID_TEXT} AS item_id, title, price, price_value,
+                       description, link, found_at
+                FROM found_items
+                WHERE {conditions}
+                ORDER BY found_at DESC
+                LIMIT ?
+            ''', params + [limit])
+        
+        return [item_from_row(row) for row in cursor.fetchall()]
+    
+    def get_new_items(self, limit: int = 50) -> List[Item]:
+        """Получение последних новых объявлений"""
+        conn = self.get_connection()
+        cursor = conn.execute('''
+            SELECT item_id, title, price, price_value, description, link, found_at
             FROM new_items
             ORDER BY found_at DESC
             LIMIT ?
         ''', (limit,))
         
-        items = []
-        for row in cursor.fetchall():
-            items.append({
-                'id': row['item_id'],
-                'title': row['title'],
-                'price': row['price'],
-                'description': row['description'],
-                'link': row['link'],
-                'found_at': row['found_at']
-            })
-        
-        conn.close()
-        return items
+        return [item_from_row(row) for row in cursor.fetchall()]
     
     def mark_as_notified(self, item_id: str):
         """Отметить объявление как отправленное в уведомлении"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.transaction() as cursor:
+            cursor.execute('''
+                UPDATE found_items
+                SET notified = 1
+                WHERE item_id = ?
+            ''', (item_key(item_id),))
+    
+    def _load_config_cache(self) -> Dict:
+        """
+        Кэш конфигурации с дешевой проверкой актуальности
         
-        cursor.execute('''
-            UPDATE found_items
-            SET notified = 1
-            WHERE item_id = ?
-        ''', (item_id,))
+        PRAGMA data_version меняется, только если базу изменило другое
+        соединение, и читается без обращения к диску. Только тогда сверяется
+        счетчик config_version, и только при его изменении конфигурация
+        перечитывается целиком.
+        """
+        conn = self.get_connection()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
         
-        conn.commit()
-        conn.close()
+        with self._config_lock:
+            if self._config_cache is not None and getattr(self._local, 'data_version', None) == data_version:
+                return self._config_cache
+            
+            version = conn.execute(SQL_GET_CONFIG_VERSION).fetchone()[0]
+            if self._config_cache is None or version != self._config_version:
+                config = {}
+                for row in conn.execute('SELECT key, value FROM config'):
+                    config[row['key']] = decode_config_value(row['value'])
+                self._config_cache = config
+                self._config_version = version
+            
+            self._local.data_version = data_version
+            return self._config_cache
+    
+    def get_config_version(self) -> int:
+        """Версия конфигурации (меняется при любом изменении таблицы config)"""
+        self._load_config_cache()
+        return self._config_version
     
     def get_config(self, key: str, default: any = None) -> any:
         """Получение значения конфигурации"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT value FROM config WHERE key = ?', (key,))
-        row = cursor.fetchone()
-        
-        conn.close()
-        
-        if row is None:
+        config = self._load_config_cache()
+        if key not in config:
             return default
-        
-        try:
-            # Пробуем распарсить JSON
-            return json.loads(row['value'])
-        except:
-            # Если не JSON, возвращаем как строку
-            return row['value']
+        # Копия, чтобы изменения вызывающего кода не портили кэш
+        return copy.deepcopy(config[key])
     
     def set_config(self, key: str, value: any):
         """Установка значения конфигурации"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Преобразуем значение в JSON строку
-        if isinstance(value, (dict, list)):
-            value_str = json.dumps(value, ensure_ascii=False)
-        else:
-            value_str = str(value)
+        self.set_configs({key: value})
+    
+    def set_configs(self, values: Dict):
+        """Установка нескольких значений конфигурации одной транзакцией"""
+        rows = [(key, encode_config_value(value)) for key, value in values.items()]
+        if not rows:
+            return
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO config (key, value, updated_at)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''', (key, value_str))
+        with self.transaction() as cursor:
+            cursor.executemany(SQL_SET_CONFIG, rows)
+            version = cursor.execute(SQL_GET_CONFIG_VERSION).fetchone()[0]
         
-        conn.commit()
-        conn.close()
+        # Обновляем кэш сразу: свои коммиты не меняют data_version соединения.
+        # Каждая строка увеличивает версию на 1; если прирост другой, значит
+        # конфигурацию менял кто-то еще, и кэш надо перечитать
+        with self._config_lock:
+            if self._config_cache is not None and version == self._config_version + len(rows):
+                cache = dict(self._config_cache)
+                for key, value_str in rows:
+                    cache[key] = decode_config_value(value_str)
+                self._config_cache = cache
+                self._config_version = version
+            else:
+                self._config_cache = None
     
     def get_all_config(self) -> Dict:
         """Получение всей конфигурации"""
+        return copy.deepcopy(self._load_config_cache())
+    
+    def clear_found_items(self):
+        """Очистить список найденных объявлений"""
+        with self.transaction() as cursor:
+            cursor.execute('DELETE FROM found_items')
+            cursor.execute('DELETE FROM new_items')
+            cursor.execute('DELETE FROM subscriber_items')
+            cursor.execute('DELETE FROM hourly_new_items')
+            cursor.execute("UPDATE counters SET value = NULL WHERE key = 'last_found_at'")
+        self.seen_cache.reset()
+    
+    def get_stats(self) -> Dict:
+        """
+        Получение статистики
+        
+        Значения поддерживают триггеры, поэтому запрос читает несколько
+        строк по первичному ключу независимо от размера таблиц.
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        row = conn.execute('''
+            SELECT
+                (SELECT value FROM counters WHERE key = 'total_found') AS total_found,
+                (SELECT value FROM counters WHERE key = 'last_found_at') AS last_found_at,
+                (SELECT COALESCE(SUM(new_count), 0) FROM hourly_new_items
+                 WHERE hour >= strftime('%Y-%m-%d %H', 'now', 'localtime', '-1 day')) AS new_today
+        ''').fetchone()
         
-        cursor.execute('SELECT key, value FROM config')
-        config = {}
+        return {
+            'total_found': row['total_found'] or 0,
+            'new_today': row['new_today'],
+            'last_found_at': row['last_found_at']
+        }
+    
+    def get_retention(self) -> Dict:
+        """Сроки хранения по таблицам (значения по умолчанию + конфигурация)"""
+        retention = dict(self.DEFAULT_RETENTION)
+        configured = self.get_config('retention', {})
+        if isinstance(configured, dict):
+            retention.update(configured)
+        return retention
+    
+    def rollup_daily_stats(self, max_days: int = None) -> int:
+        """
+        Сводка завершенных дней из new_items в daily_stats
         
-        for row in cursor.fetchall():
-            try:
-                config[row['key']] = json.loads(row['value'])
-            except:
-                config[row['key']] = row['value']
+        Args:
+            max_days: Максимум дней за один вызов
+        
+        Returns:
+            Количество свернутых дней
+        """
+        if max_days is None:
+            max_days = self.MAINTENANCE_ROLLUP_DAYS
         
-        conn.close()
-        return config
-    
-    def clear_found_items(self):
-        """Очистить список найденных объявлений"""
         conn = self.get_connection()
-        cursor = conn.cursor()
+        today = datetime.now().date().isoformat()
+        rolled = 0
         
-        cursor.execute('DELETE FROM found_items')
-        cursor.execute('DELETE FROM new_items')
+        while rolled < max_days:
+            # Первый день после последней сводки, в котором есть объявления
+            last_day = conn.execute('SELECT MAX(day) FROM daily_stats').fetchone()[0]
+            start = (datetime.fromisoformat(last_day) + timedelta(days=1)).date().isoformat() if last_day else ''
+            first = conn.execute(
+                'SELECT MIN(found_at) FROM new_items WHERE found_at >= ?', (start,)
+            ).fetchone()[0]
+            if not first:
+                break
+            
+            day = str(first)[:10]
+            if day >= today:
+                # Текущий день еще не закончился
+                break
+            next_day = (datetime.fromisoformat(day) + timedelta(days=1)).date().isoformat()
+            
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO daily_stats
+                        (day, items_count, price_count, price_sum, price_min, price_max)
+                    SELECT ?, COUNT(*), COUNT(p), SUM(p), MIN(p), MAX(p)
+                    FROM (
+                        SELECT price_value AS p FROM new_items
+                        WHERE found_at >= ? AND found_at < ?
+                    )
+                ''', (day, day, next_day))
+            rolled += 1
         
-        conn.commit()
-        conn.close()
+        return rolled
     
-    def get_stats(self) -> Dict:
-        """Получение статистики"""
+    def prune_old_items(self, max_rows: int = None) -> Dict:
+        """
+        Удаление объявлений старше срока хранения (не больше max_rows на таблицу)
+        
+        Из new_items удаляются только дни, уже попавшие в daily_stats.
+        
+        Returns:
+            Количество удаленных строк по таблицам
+        """
+        if max_rows is None:
+            max_rows = self.MAINTENANCE_BATCH_ROWS
+        
+        retention = self.get_retention()
+        now = datetime.now()
         conn = self.get_connection()
-        cursor = conn.cursor()
+        deleted = {'found_items': 0, 'new_items': 0, 'subscriber_items': 0}
         
-        # Общее количество найденных объявлений
-        cursor.execute('SELECT COUNT(*) as count FROM found_items')
-        total_found = cursor.fetchone()['count']
+        # Колонка первичного ключа каждой таблицы
+        key_columns = {'found_items': 'item_id', 'new_items': 'id', 'subscriber_items': 'rowid'}
         
-        # Количество новых объявлений за последние 24 часа
-        cursor.execute('''
-            SELECT COUNT(*) as count FROM new_items
-            WHERE found_at > datetime('now', '-1 day')
-        ''')
-        new_today = cursor.fetchone()['count']
+        for table, key_column in key_columns.items():
+            days = retention.get(f'{table}_days') or 0
+            if days <= 0:
+                continue
+            # new_items нужен для подсчета "новых за 24ч"
+            if table == 'new_items':
+                days = max(days, 2)
+            cutoff = (now - timedelta(days=days)).isoformat()
+            
+            if table == 'new_items':
+                last_day = conn.execute('SELECT MAX(day) FROM daily_stats').fetchone()[0]
+                if not last_day:
+                    continue
+                rolled_until = (datetime.fromisoformat(last_day) + timedelta(days=1)).date().isoformat()
+                cutoff = min(cutoff, rolled_until)
+            
+            with self.transaction() as cursor:
+                cursor.execute(f'''
+                    DELETE FROM {table} WHERE {key_column} IN (
+                        SELECT {key_column} FROM {table}
+                        WHERE found_at < ?
+                        ORDER BY found_at
+                        LIMIT ?
+                    )
+                ''', (cutoff, max_rows))
+                deleted[table] = cursor.rowcount
         
-        # Последнее найденное объявление
-        cursor.execute('''
-            SELECT found_at FROM found_items
-            ORDER BY found_at DESC
-            LIMIT 1
-        ''')
-        last_found = cursor.fetchone()
-        last_found_at = last_found['found_at'] if last_found else None
+        # Удаленные ID не должны считаться виденными в кэше и Bloom-фильтре
+        if deleted['found_items']:
+            self.warm_seen_cache()
+        
+        # Почасовые счетчики нужны только для окна в 24 часа
+        with self.transaction() as cursor:
+            cursor.execute(
+                "DELETE FROM hourly_new_items WHERE hour < strftime('%Y-%m-%d %H', 'now', 'localtime', '-2 days')"
+            )
         
-        conn.close()
+        return deleted
+    
+    def incremental_vacuum(self, max_pages: int = None) -> int:
+        """
+        Возврат свободных страниц файлу (не больше max_pages за вызов)
         
+        Returns:
+            Количество свободных страниц до вызова
+        """
+        if max_pages is None:
+            max_pages = self.MAINTENANCE_VACUUM_PAGES
+        
+        conn = self.get_connection()
+        freelist = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if freelist:
+            # executescript прогоняет прагму до конца (execute делает один шаг)
+            conn.executescript(f'PRAGMA incremental_vacuum({int(max_pages)});')
+        return freelist
+    
+    def run_maintenance(self) -> Dict:
+        """Один тик обслуживания: сводка, удаление старого, vacuum"""
+        rolled = self.rollup_daily_stats()
+        deleted = self.prune_old_items()
+        freelist = self.incremental_vacuum()
         return {
-            'total_found': total_found,
-            'new_today': new_today,
-            'last_found_at': last_found_at
+            'rolled_days': rolled,
+            'deleted': deleted,
+            'freelist_pages': freelist
         }
-
-
+    
+    def start_maintenance(self, interval_seconds: int = None):
+        """Запуск фонового обслуживания базы (повторный вызов ничего не делает)"""
+        if self._maintenance_thread and self._maintenance_thread.is_alive():
+            return
+        if interval_seconds is None:
+            interval_seconds = self.MAINTENANCE_INTERVAL_SECONDS
+        
+        self._maintenance_stop.clear()
+        
+        def maintenance_loop():
+            while not self._maintenance_stop.is_set():
+                try:
+                    result = self.run_maintenance()
+                    deleted = result['deleted']
+                    if result['rolled_days'] or deleted['found_items'] or deleted['new_items']:
+                        print(f"🧹 Обслуживание БД: свернуто дней {result['rolled_days']}, "
+                              f"удалено {deleted['found_items']} + {deleted['new_items']} строк")
+                except Exception as e:
+                    print(f"⚠️ Ошибка обслуживания БД: {e}")
+                self._maintenance_stop.wait(interval_seconds)
+        
+        self._maintenance_thread = threading.Thread(
+            target=maintenance_loop, name='db-maintenance', daemon=True
+        )
+        self._maintenance_thread.start()
+    
+    def stop_maintenance(self):
+        """Остановка фонового обслуживания"""
+        self._maintenance_stop.set()
+        thread = self._maintenance_thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._maintenance_thread = None
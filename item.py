@@ -0,0 +1,205 @@
+"""
+Объявление: компактная запись вместо словаря
+"""
+import re
+import time
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Union
+
+
+PRICE_RE = re.compile(r'(\d[\d \u00a0\u202f\u2009]*)(?:[.,]\d+)?')
+
+
+def parse_price(price: Optional[str]) -> Optional[int]:
+    """
+    Извлечение числа рублей из строки цены ("12 500 ₽" -> 12500)
+    
+    Returns:
+        Цена в рублях или None, если цифр в строке нет
+    """
+    if price is None:
+        return None
+    if isinstance(price, (int, float)):
+        return int(price)
+    # Первое число с разделителями разрядов (пробел, неразрывный пробел),
+    # копейки после запятой/точки отбрасываем
+    match = PRICE_RE.search(str(price))
+    if not match:
+        return None
+    digits = re.sub(r'\D', '', match.group(1))
+    return int(digits) if digits else None
+
+
+def format_price(value: Optional[int]) -> str:
+    """Цена для показа: 12500 -> "12 500 ₽" """
+    if value is None:
+        return ''
+    return f"{value:,}".replace(',', ' ') + ' ₽'
+
+
+def parse_id(item_id) -> Union[int, str]:
+    """
+    ID объявления: число для числовых ID Авито
+    
+    Нечисловые ID (например md5-хеш ссылки из браузерного парсера) остаются строкой.
+    """
+    if isinstance(item_id, int):
+        return item_id
+    item_id = str(item_id)
+    if item_id.isdigit() and item_id == str(int(item_id)) and int(item_id) < 2 ** 63:
+        return int(item_id)
+    return item_id
+
+
+def to_timestamp(value) -> Optional[float]:
+    """Время в секундах эпохи из числа или строки ISO 8601"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def format_timestamp(timestamp: Optional[float]) -> Optional[str]:
+    """Время для показа и хранения в БД (ISO 8601, местное время)"""
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+class Item:
+    """
+    Объявление из выдачи
+    
+    Хранит ID числом, цену числом и время в секундах эпохи, а строки для
+    показа (цена, время) строит только при обращении: на страницах из сотен
+    объявлений большинство так и не доходит до БД и уведомлений.
+    
+    Для совместимости с кодом, который работал со словарями, поддерживает
+    item['title'], item.get('price') и dict(item) с прежними ключами
+    (ID в словарном виде - строка).
+    """
+    __slots__ = ('id', 'title', 'price_value', 'price_text', 'description', 'link',
+                 'location', 'published_ts', 'images', 'found_ts', 'subscriber')
+    
+    # Ключи словарного вида по порядку
+    KEYS = ('id', 'title', 'price', 'price_value', 'description', 'link',
+            'location', 'published_at', 'images', 'found_at')
+    
+    def __init__(self, id, title: str = '', price_value: int = None, price_text: str = None,
+                 description: str = '', link: str = '', location: str = '',
+                 published_ts: float = None, images: Sequence[str] = (),
+                 found_ts: float = None, subscriber: str = None):
+        """
+        Args:
+            id: ID объявления (строка из цифр становится числом)
+            price_value: Цена в рублях (если не задана, берется из price_text)
+            price_text: Цена как на странице (если не задана, строится из price_value)
+            published_ts: Время публикации (секунды эпохи)
+            found_ts: Время обнаружения (секунды эпохи, по умолчанию - сейчас)
+            subscriber: Кому отправить уведомление (None - в общий чат)
+        """
+        self.id = parse_id(id)
+        self.title = title or ''
+        if price_value is None and price_text:
+            price_value = parse_price(price_text)
+        self.price_value = price_value
+        self.price_text = price_text or None
+        self.description = description or ''
+        self.link = link or ''
+        self.location = location or ''
+        self.published_ts = published_ts
+        self.images = tuple(images) if images else ()
+        self.found_ts = found_ts if found_ts is not None else time.time()
+        self.subscriber = subscriber
+    
+    @property
+    def price(self) -> str:
+        """Цена для показа"""
+        if self.price_text is not None:
+            return self.price_text
+        return format_price(self.price_value)
+    
+    @property
+    def published_at(self) -> Optional[str]:
+        return format_timestamp(self.published_ts)
+    
+    @property
+    def found_at(self) -> str:
+        return format_timestamp(self.found_ts)
+    
+    @classmethod
+    def from_dict(cls, data: Union['Item', Dict]) -> 'Item':
+        """Объявление из словаря с прежними ключами (или само объявление)"""
+        if isinstance(data, cls):
+            return data
+        return cls(
+            data.get('id'),
+            title=data.get('title', ''),
+            price_value=data.get('price_value'),
+            price_text=data.get('price'),
+            description=data.get('description', ''),
+            link=data.get('link', ''),
+            location=data.get('location', ''),
+            published_ts=to_timestamp(data.get('published_at')),
+            images=data.get('images') or (),
+            found_ts=to_timestamp(data.get('found_at')),
+            subscriber=data.get('subscriber'),
+        )
+    
+    def as_tuple(self) -> tuple:
+        """Поля по порядку __slots__ (для передачи между процессами)"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    @classmethod
+    def from_tuple(cls, row: tuple) -> 'Item':
+        return cls(*row)
+    
+    def copy(self, **changes) -> 'Item':
+        """Копия с измененными полями (например subscriber)"""
+        item = Item.from_tuple(self.as_tuple())
+        for name, value in changes.items():
+            setattr(item, name, value)
+        return item
+    
+    # Словарный доступ
+    
+    def keys(self) -> tuple:
+        if self.subscriber is not None:
+            return self.KEYS + ('subscriber',)
+        return self.KEYS
+    
+    def __getitem__(self, key: str):
+        if key == 'id':
+            return str(self.id)
+        if key in self.KEYS or key == 'subscriber':
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def __contains__(self, key) -> bool:
+        return key in self.keys()
+    
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+    
+    def to_dict(self) -> Dict:
+        return dict(self.items())
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Item):
+            return NotImplemented
+        return self.as_tuple() == other.as_tuple()
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return f"Item(id={self.id!r}, title={self.title!r}, price={self.price!r})"
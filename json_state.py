@@ -0,0 +1,198 @@
+"""
+Извлечение объявлений из JSON, встроенного в страницу поиска Авито
+"""
+import json
+import re
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+from item import Item, format_price, to_timestamp
+
+
+BASE_URL = "https://www.avito.ru"
+
+# Один проход по HTML: блок ld+json или состояние window.__initialData__ / __preloadedState__
+STATE_RE = re.compile(
+    r'<script[^>]*type="application/ld\+json"[^>]*>(?P<ld>.*?)</script>'
+    r'|window\.(?P<name>__initialData__|__preloadedState__)\s*=\s*"(?P<state>[^"]*)"',
+    re.S
+)
+# ID объявления в конце ссылки: /moskva/telefony/iphone_13_1234567890
+LINK_ID_RE = re.compile(r'_(\d+)(?:[/?#]|$)')
+# ID карточек объявлений в HTML в порядке выдачи
+ITEM_ID_RE = re.compile(r'data-item-id="(\d+)"')
+
+
+def to_int(value) -> Optional[int]:
+    """Число из строки или числа JSON"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        digits = re.sub(r'\D', '', str(value))
+        return int(digits) if digits else None
+
+
+def absolute_link(url: str) -> str:
+    """Полная ссылка на объявление"""
+    if url and url.startswith('/'):
+        return f"{BASE_URL}{url}"
+    return url or ''
+
+
+def _state_item(raw: Dict) -> Optional[Item]:
+    """Объявление из состояния приложения (catalog.items)"""
+    item_id = raw.get('id')
+    if not item_id:
+        return None
+    
+    price_detailed = raw.get('priceDetailed') or {}
+    price_value = to_int(price_detailed.get('value'))
+    # Строка цены со страницы нужна только если она отличается от стандартной
+    price = price_detailed.get('string') or price_detailed.get('fullString')
+    if price == format_price(price_value):
+        price = None
+    
+    location = raw.get('location') or {}
+    geo = raw.get('geo') or {}
+    
+    published_ts = None
+    timestamp = raw.get('sortTimeStamp')
+    if timestamp:
+        # Время в миллисекундах
+        published_ts = int(timestamp) / 1000
+    
+    images = []
+    for image in raw.get('images') or []:
+        if isinstance(image, dict) and image:
+            # Размеры вида "208x156": берем самый крупный
+            size = max(image, key=lambda key: to_int(key.split('x')[0]) or 0)
+            images.append(image[size])
+        elif isinstance(image, str):
+            images.append(image)
+    
+    return Item(
+        item_id,
+        title=raw.get('title', ''),
+        price_value=price_value,
+        price_text=price,
+        description=raw.get('description', ''),
+        link=absolute_link(raw.get('urlPath', '')),
+        location=location.get('name') or geo.get('formattedAddress', ''),
+        published_ts=published_ts,
+        images=images,
+    )
+
+
+def _find_state_items(state) -> List[Dict]:
+    """
+    Поиск списка объявлений в дереве состояния (без привязки к точному пути)
+    
+    Объявление - словарь с id и urlPath. Если таких списков несколько
+    (выдача, рекомендации), берется самый длинный.
+    """
+    best = []
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            records = [entry for entry in node if isinstance(entry, dict)]
+            # Рекламные вставки и баннеры в выдаче пропускаем
+            listings = [entry for entry in records if 'id' in entry and 'urlPath' in entry]
+            if len(listings) > len(best):
+                best = listings
+            stack.extend(records)
+    return best
+
+
+def items_from_state(state) -> List[Item]:
+    """Нормализованные объявления из состояния приложения или ответа API"""
+    return [item for item in map(_state_item, _find_state_items(state)) if item]
+
+
+def _offer_item(offer: Dict) -> Optional[Item]:
+    """Объявление из schema.org Offer (ld+json)"""
+    link = offer.get('url', '')
+    match = LINK_ID_RE.search(link)
+    if not match:
+        return None
+    
+    price_value = to_int(offer.get('price'))
+    image = offer.get('image')
+    if isinstance(image, str):
+        images = [image]
+    else:
+        images = list(image or [])
+    
+    # В ld+json нет города, но он есть в ссылке: /kotelniki/odezhda/...
+    path = link.replace(BASE_URL, '').strip('/').split('/')
+    
+    return Item(
+        match.group(1),
+        title=offer.get('name', ''),
+        price_value=price_value,
+        description=offer.get('description', ''),
+        link=absolute_link(link),
+        location=path[0] if len(path) > 1 else '',
+        published_ts=to_timestamp(offer.get('validFrom')),
+        images=images,
+    )
+
+
+def _find_offers(data) -> List[Dict]:
+    """Список Offer из ld+json (@graph -> Product -> AggregateOffer -> offers)"""
+    nodes = data.get('@graph', [data]) if isinstance(data, dict) else data
+    offers = []
+    for node in nodes if isinstance(nodes, list) else []:
+        aggregate = node.get('offers') if isinstance(node, dict) else None
+        if isinstance(aggregate, dict):
+            entries = aggregate.get('offers') or []
+            offers.extend(entry for entry in entries if isinstance(entry, dict))
+        elif isinstance(aggregate, list):
+            offers.extend(entry for entry in aggregate if isinstance(entry, dict))
+    return offers
+
+
+def extract_items(html: str) -> Optional[List[Item]]:
+    """
+    Объявления из JSON, встроенного в страницу
+    
+    Предпочитается состояние приложения (там есть город, время и все фото),
+    иначе берутся предложения из ld+json. В ld+json бывает только часть
+    выдачи (на сохраненной странице 50 из 82 объявлений, без самых новых),
+    поэтому он используется, только если в нем есть все карточки страницы.
+    
+    Returns:
+        Список объявлений в порядке выдачи или None, если JSON на странице
+        не найден (тогда нужен разбор DOM)
+    """
+    if not html:
+        return None
+    
+    offers = []
+    for match in STATE_RE.finditer(html):
+        try:
+            if match.group('ld') is not None:
+                offers.extend(_find_offers(json.loads(match.group('ld'))))
+                continue
+            
+            state = json.loads(unquote(match.group('state')))
+        except ValueError:
+            continue
+        
+        items = items_from_state(state)
+        if items:
+            return items
+    
+    if offers:
+        items = [item for item in map(_offer_item, offers) if item]
+        by_id = {str(item.id): item for item in items}
+        card_ids = list(dict.fromkeys(ITEM_ID_RE.findall(html)))
+        if items and set(card_ids) <= set(by_id):
+            # Разбор до водяного знака рассчитывает на порядок выдачи, поэтому
+            # объявления идут в порядке карточек страницы
+            rest = [item for item in items if str(item.id) not in set(card_ids)]
+            return [by_id[item_id] for item_id in card_ids] + rest
+    return None
@@ -0,0 +1,101 @@
+"""
+Разбор страниц поиска в пуле процессов
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+from item import Item
+from json_state import extract_items
+from parser_backends import get_parser_backend, parse_document
+from watermark import Watermark
+
+
+# Результат разбора страницы: (источник 'json' или 'dom', сработавшая стратегия,
+# стратегии без результата, объявления кортежами Item.as_tuple, водяной знак)
+PageRows = Tuple[str, Optional[str], List[str], List[tuple], Optional[Watermark]]
+
+
+def available_cores() -> int:
+    """Ядра, доступные процессу (с учетом ограничений контейнера)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def parse_page_rows(html: str, backend_name: str, strategies: Sequence[str], limit: int,
+                    watermark: Watermark = None) -> PageRows:
+    """
+    Разбор одной страницы внутри процесса пула
+    
+    Водяной знак возвращается обратно: в процессе он отмечает, встретились
+    ли уже виденные объявления.
+    """
+    items = extract_items(html)
+    if items is not None:
+        if limit:
+            items = items[:limit]
+        if watermark is not None:
+            items = watermark.cut(items)
+        return 'json', None, [], [item.as_tuple() for item in items], watermark
+    
+    document = get_parser_backend(backend_name).parse(html)
+    strategy, tried, items = parse_document(document, strategies, limit, watermark)
+    return 'dom', strategy, tried, [item.as_tuple() for item in items], watermark
+
+
+def items_from_rows(rows: List[tuple]) -> List[Item]:
+    """Объявления из кортежей, полученных от процессов"""
+    return [Item.from_tuple(row) for row in rows]
+
+
+class ParsePool:
+    def __init__(self, workers: int = None):
+        """
+        Пул процессов для разбора HTML
+        
+        Разбор держит GIL, поэтому в одном процессе страницы многих поисков
+        разбираются по очереди на одном ядре. Процессы получают HTML и
+        возвращают компактные кортежи, а не деревья BeautifulSoup/lxml.
+        Процессы запускаются через spawn: fork процесса с потоками (event
+        loop загрузчика, обслуживание БД) может унаследовать захваченные блокировки.
+        
+        Args:
+            workers: Число процессов (по умолчанию - по числу доступных ядер)
+        """
+        self.workers = workers or available_cores()
+        self._executor = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Пул запускается при первом использовании"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._executor
+    
+    def parse(self, pages: List[str], backend_name: str, strategies: Sequence[str], limit: int,
+              watermarks: Sequence[Optional[Watermark]] = None) -> List[PageRows]:
+        """
+        Параллельный разбор страниц
+        
+        Args:
+            watermarks: Водяные знаки страниц в порядке pages (None - разбирать все)
+        
+        Returns:
+            Результаты в порядке страниц
+        """
+        executor = self._get_executor()
+        watermarks = watermarks or [None] * len(pages)
+        futures = [
+            executor.submit(parse_page_rows, html, backend_name, list(strategies), limit, watermark)
+            for html, watermark in zip(pages, watermarks)
+        ]
+        return [future.result() for future in futures]
+    
+    def close(self):
+        """Остановка процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
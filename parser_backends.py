@@ -0,0 +1,327 @@
+"""
+Разбор DOM страницы поиска: BeautifulSoup (html.parser) или lxml
+"""
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+from item import Item
+
+try:
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+
+# Контейнеры объявлений по порядку: (тег, атрибут, '=' или '*=', значение)
+ITEM_SELECTORS = [
+    ('div', 'data-marker', '=', 'item'),
+    ('div', 'data-marker', '*=', 'item'),
+    ('article', 'data-marker', '=', 'item'),
+    ('div', 'itemprop', '=', 'itemListElement'),
+    ('div', 'class', '*=', 'iva-item'),
+    ('div', 'class', '*=', 'item-root'),
+]
+# Дорогие обходы всего дерева, если ни один селектор не сработал
+SCAN_ITEM_CLASS = 'scan:div[class*=item]'
+SCAN_ITEM_ID = 'scan:[data-item-id]'
+# Имена стратегий поиска контейнеров по порядку (ключи статистики селекторов)
+ITEM_STRATEGIES = [f'{tag}[{attr}{op}"{value}"]' for tag, attr, op, value in ITEM_SELECTORS]
+ITEM_STRATEGIES += [SCAN_ITEM_CLASS, SCAN_ITEM_ID]
+
+
+def class_matches(value, words: Sequence[str]) -> bool:
+    """Класс элемента содержит одно из слов (без учета регистра)"""
+    if not value:
+        return False
+    if not isinstance(value, str):
+        value = ' '.join(value)
+    value = value.lower()
+    return any(word in value for word in words)
+
+
+class SoupBackend:
+    """BeautifulSoup с html.parser: медленно, но без C-расширений"""
+    name = 'bs4'
+    
+    def parse(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, 'html.parser')
+    
+    def select(self, document, strategy: str) -> List[Tag]:
+        """Контейнеры объявлений по одной стратегии из ITEM_STRATEGIES"""
+        if strategy == SCAN_ITEM_CLASS:
+            # Ищем все div с классами содержащими item
+            return document.find_all('div', class_=lambda x: class_matches(x, ('item',)))
+        if strategy == SCAN_ITEM_ID:
+            return document.find_all(attrs={'data-item-id': True})
+        return document.select(strategy)
+    
+    def get(self, element: Tag, name: str) -> Optional[str]:
+        return element.get(name)
+    
+    def find(self, element: Tag, tags: Iterable[str], classes: Sequence[str] = ()) -> Optional[Tag]:
+        """Первый потомок с одним из тегов (и словом из classes в классе)"""
+        if classes:
+            return element.find(list(tags), class_=lambda x: class_matches(x, classes))
+        return element.find(list(tags))
+    
+    def find_attr(self, element: Tag, tag: str, name: str, value: str = None) -> Optional[Tag]:
+        """Первый потомок с атрибутом name (и значением value, если задано)"""
+        return element.find(tag, attrs={name: value if value is not None else True})
+    
+    def text(self, element: Tag) -> str:
+        return element.get_text(strip=True)
+
+
+class LxmlBackend:
+    """lxml (libxml2): дерево строится на C, в разы быстрее html.parser"""
+    name = 'lxml'
+    
+    def parse(self, html: str):
+        return lxml.html.document_fromstring(html)
+    
+    # Стратегия -> XPath (CSS в lxml требует пакета cssselect)
+    XPATHS = {
+        name: f'//{tag}[@{attr}="{value}"]' if op == '=' else f'//{tag}[contains(@{attr}, "{value}")]'
+        for name, (tag, attr, op, value) in zip(ITEM_STRATEGIES, ITEM_SELECTORS)
+    }
+    XPATHS[SCAN_ITEM_ID] = '//*[@data-item-id]'
+    
+    def select(self, document, strategy: str) -> list:
+        """Контейнеры объявлений по одной стратегии (результат как у SoupBackend)"""
+        if strategy == SCAN_ITEM_CLASS:
+            return [element for element in document.iter('div') if class_matches(element.get('class'), ('item',))]
+        return document.xpath(self.XPATHS[strategy])
+    
+    def get(self, element, name: str) -> Optional[str]:
+        return element.get(name)
+    
+    def find(self, element, tags: Iterable[str], classes: Sequence[str] = ()):
+        for child in element.iterdescendants(*tags):
+            if not classes or class_matches(child.get('class'), classes):
+                return child
+        return None
+    
+    def find_attr(self, element, tag: str, name: str, value: str = None):
+        for child in element.iterdescendants(tag):
+            attr = child.get(name)
+            if attr is not None and (value is None or attr == value):
+                return child
+        return None
+    
+    def text(self, element) -> str:
+        # Как get_text(strip=True): без script/style, каждый кусок без пробелов по краям
+        strings = element.xpath('.//text()[not(parent::script) and not(parent::style)]')
+        return ''.join(string.strip() for string in strings)
+
+
+PARSER_BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend,
+}
+
+
+def get_parser_backend(name: str = None):
+    """
+    Бэкенд разбора DOM по имени (ключ конфигурации html_parser)
+    
+    По умолчанию lxml, если он установлен, иначе BeautifulSoup.
+    """
+    if name not in PARSER_BACKENDS:
+        name = 'lxml' if HAS_LXML else 'bs4'
+    if name == 'lxml' and not HAS_LXML:
+        print("⚠️ lxml не установлен, разбор через BeautifulSoup")
+        name = 'bs4'
+    return PARSER_BACKENDS[name]()
+
+
+def select_items(document, strategies: Sequence[str] = None) -> Tuple[Optional[str], list, List[str]]:
+    """
+    Контейнеры объявлений: стратегии пробуются по порядку до первой сработавшей
+    
+    Returns:
+        (сработавшая стратегия или None, элементы, стратегии без результата)
+    """
+    backend = backend_for(document)
+    tried = []
+    for strategy in strategies or ITEM_STRATEGIES:
+        found = backend.select(document, strategy)
+        if found:
+            return strategy, found, tried
+        tried.append(strategy)
+    return None, [], tried
+
+
+def backend_for(node):
+    """Бэкенд, которым построен документ или элемент"""
+    if isinstance(node, Tag):
+        return SoupBackend()
+    return LxmlBackend()
+
+
+def extract_item_id(dom, item_element) -> Tuple[Optional[str], Optional[str]]:
+    """
+    ID и ссылка объявления - без разбора заголовка, цены и описания
+    
+    Returns:
+        (ID или None, ссылка или None)
+    """
+    # Получаем ID объявления
+    item_id = None
+    item_link = None
+    
+    # Сначала пробуем найти data-item-id
+    item_id = dom.get(item_element, 'data-item-id')
+    
+    # Ищем ссылку на объявление
+    link_elem = dom.find_attr(item_element, 'a', 'href')
+    if link_elem is not None:
+        item_link = dom.get(link_elem, 'href') or ''
+        if item_link.startswith('/'):
+            item_link = f"https://www.avito.ru{item_link}"
+        
+        # Извлекаем ID из ссылки если еще не нашли
+        if not item_id:
+            if '/items/' in item_link:
+                item_id = item_link.split('/items/')[-1].split('?')[0]
+            elif '/i' in item_link:
+                # Формат: /category/location/i/item_id
+                parts = item_link.split('/')
+                for i, part in enumerate(parts):
+                    if part == 'i' and i + 1 < len(parts):
+                        item_id = parts[i + 1].split('?')[0]
+                        break
+            else:
+                # Пробуем найти ID в любом месте ссылки
+                match = re.search(r'/(\d+)(?:\?|$)', item_link)
+                if match:
+                    item_id = match.group(1)
+    
+    # Если все еще нет ID, пробуем найти в других атрибутах
+    if not item_id:
+        item_id = dom.get(item_element, 'id') or ''
+        # Убираем префиксы если есть
+        if item_id and '_' in item_id:
+            item_id = item_id.split('_')[-1]
+    
+    return item_id or None, item_link
+
+
+def extract_item(item_element) -> Optional[Item]:
+    """Извлечение данных из объявления (элемент BeautifulSoup или lxml)"""
+    try:
+        dom = backend_for(item_element)
+        item_id, item_link = extract_item_id(dom, item_element)
+        if not item_id:
+            return None
+        return extract_item_fields(dom, item_element, item_id, item_link)
+    except Exception as e:
+        print(f"Ошибка при извлечении данных: {e}")
+        return None
+
+
+def extract_item_fields(dom, item_element, item_id: str, item_link: Optional[str]) -> Item:
+    """Заголовок, цена и описание объявления с уже известным ID"""
+    # Получаем заголовок
+    title = ""
+    # Пробуем разные варианты поиска заголовка: (тег, слова в классе)
+    title_selectors = [
+        ('h3', ('title',)),
+        ('a', ('title', 'link')),
+        ('div', ('title',)),
+        ('span', ('title',)),
+    ]
+    
+    for tag, classes in title_selectors:
+        title_elem = dom.find(item_element, [tag], classes)
+        if title_elem is not None:
+            title = dom.text(title_elem)
+            break
+    
+    # Если не нашли, берем первый заголовок или ссылку
+    if not title:
+        title_elem = dom.find(item_element, ['h3', 'h2', 'h1', 'a'])
+        if title_elem is not None:
+            title = dom.text(title_elem)
+    
+    # Получаем цену
+    price = ""
+    for tag in ('span', 'div'):
+        price_elem = dom.find(item_element, [tag], ('price',))
+        if price_elem is not None:
+            price = dom.text(price_elem)
+            if price:
+                break
+    
+    # Пробуем через meta
+    if not price:
+        price_elem = dom.find_attr(item_element, 'meta', 'itemprop', 'price')
+        if price_elem is not None:
+            price = dom.get(price_elem, 'content') or ''
+    
+    # Получаем описание/локацию
+    description = ""
+    desc_elem = dom.find(item_element, ['div', 'span'], ('description', 'location', 'geo'))
+    if desc_elem is not None:
+        description = dom.text(desc_elem)
+    
+    return Item(
+        item_id,
+        title=title,
+        price_text=price,
+        description=description,
+        link=item_link or f"https://www.avito.ru/item/{item_id}",
+    )
+
+
+def iter_items(item_elements: Iterable, watermark=None) -> Iterator[Item]:
+    """
+    Объявления по одному в порядке выдачи
+    
+    Если задан водяной знак (watermark.Watermark), у контейнера сначала
+    берется только ID: виденные объявления пропускаются без разбора полей,
+    а на границе виденного перебор останавливается.
+    """
+    for element in item_elements:
+        try:
+            dom = backend_for(element)
+            item_id, item_link = extract_item_id(dom, element)
+            if not item_id:
+                continue
+            if watermark is not None and watermark.is_known(item_id):
+                if watermark.reached:
+                    return
+                continue
+            item = extract_item_fields(dom, element, item_id, item_link)
+        except Exception as e:
+            print(f"Ошибка при парсинге объявления: {e}")
+            continue
+        yield item
+
+
+def parse_document(document, strategies: Sequence[str] = None, limit: int = 0,
+                   watermark=None) -> Tuple[Optional[str], List[str], List[Item]]:
+    """
+    Объявления из разобранной страницы
+    
+    Args:
+        document: BeautifulSoup или документ lxml
+        strategies: Порядок стратегий поиска контейнеров (по умолчанию ITEM_STRATEGIES)
+        limit: Максимум объявлений (0 - все)
+        watermark: Водяной знак выдачи (None - разбирать все объявления)
+    
+    Returns:
+        (сработавшая стратегия, стратегии без результата, объявления)
+    """
+    strategy, item_elements, tried = select_items(document, strategies)
+    
+    print(f"Найдено элементов на странице: {len(item_elements)}")
+    
+    if limit:
+        item_elements = item_elements[:limit]
+    
+    items = list(iter_items(item_elements, watermark))
+    if watermark is not None and watermark.matched:
+        print(f"Разобрано новых объявлений до уже виденных: {len(items)}")
+    return strategy, tried, items
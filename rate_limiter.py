@@ -0,0 +1,152 @@
+"""
+Адаптивное ограничение частоты запросов (token bucket + AIMD)
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+from proxy_pool import mask_proxy
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        """
+        Корзина токенов
+        
+        Args:
+            rate: Скорость пополнения (запросов в секунду)
+            capacity: Максимум накопленных токенов (размер всплеска)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        """Пополнение токенов за прошедшее время"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def reserve(self, max_wait: float = None) -> Optional[float]:
+        """
+        Резервирование токена
+        
+        Токены могут уйти в минус: каждый следующий запрос ждет дольше,
+        поэтому параллельные запросы выстраиваются в очередь по времени.
+        
+        Returns:
+            Сколько секунд подождать перед запросом, None если ждать дольше max_wait
+        """
+        now = time.monotonic()
+        self._refill(now)
+        delay = max(0.0, (1 - self.tokens) / self.rate)
+        if max_wait is not None and delay > max_wait:
+            return None
+        self.tokens -= 1
+        return delay
+
+
+class RateLimiter:
+    # Запросов в секунду на один выходной IP: стартовая, минимальная и максимальная
+    INITIAL_RATE = 0.5
+    MIN_RATE = 1 / 60
+    MAX_RATE = 5.0
+    # Размер всплеска (токенов)
+    BURST = 3
+    # AIMD: прибавка после удачного ответа и множитель после блокировки
+    INCREASE_STEP = 0.02
+    DECREASE_FACTOR = 0.5
+    # Дольше не ждем: запрос пропускается до следующей проверки
+    MAX_WAIT_SECONDS = 120
+    
+    def __init__(self, initial_rate: float = None, min_rate: float = None, max_rate: float = None,
+                 burst: float = None, max_wait: float = None):
+        """
+        Ограничение частоты запросов для каждого выходного IP (прокси или прямое соединение)
+        
+        Скорость подбирается сама: после каждого чистого ответа она немного
+        растет, после блокировки ("проблема с IP", капча, 403/429) падает вдвое.
+        Так парсер держится у максимальной частоты, которую терпит Авито.
+        
+        Args:
+            initial_rate: Стартовая скорость (запросов в секунду)
+            min_rate: Нижняя граница скорости
+            max_rate: Верхняя граница скорости
+            burst: Размер всплеска
+            max_wait: Максимальное ожидание токена (сек)
+        """
+        self.initial_rate = initial_rate or self.INITIAL_RATE
+        self.min_rate = min_rate or self.MIN_RATE
+        self.max_rate = max_rate or self.MAX_RATE
+        self.burst = burst or self.BURST
+        self.max_wait = max_wait if max_wait is not None else self.MAX_WAIT_SECONDS
+        
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+    
+    @staticmethod
+    def egress_key(proxy_url: Optional[str]) -> str:
+        """Ключ выходного IP"""
+        return proxy_url or 'direct'
+    
+    def _bucket(self, key: str) -> TokenBucket:
+        """Корзина выходного IP (создается при первом запросе)"""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.initial_rate, self.burst)
+            self._buckets[key] = bucket
+        return bucket
+    
+    def reserve(self, key: str) -> Optional[float]:
+        """Резервирование запроса: задержка в секундах или None (запрос пропустить)"""
+        with self._lock:
+            return self._bucket(key).reserve(self.max_wait)
+    
+    def wait(self, key: str) -> bool:
+        """
+        Блокирующее ожидание своей очереди (браузер, requests)
+        
+        Returns:
+            False если ждать пришлось бы дольше max_wait
+        """
+        delay = self.reserve(key)
+        if delay is None:
+            print(f"⏸️ Лимит запросов для {mask_proxy(key)}: пропускаю запрос")
+            return False
+        if delay:
+            time.sleep(delay)
+        return True
+    
+    async def wait_async(self, key: str) -> bool:
+        """Асинхронное ожидание своей очереди (aiohttp)"""
+        delay = self.reserve(key)
+        if delay is None:
+            print(f"⏸️ Лимит запросов для {mask_proxy(key)}: пропускаю запрос")
+            return False
+        if delay:
+            await asyncio.sleep(delay)
+        return True
+    
+    def report_success(self, key: str):
+        """Чистый ответ: аддитивное увеличение скорости"""
+        with self._lock:
+            bucket = self._bucket(key)
+            # Прошедшее время засчитывается по прежней скорости
+            bucket._refill(time.monotonic())
+            bucket.rate = min(self.max_rate, bucket.rate + self.INCREASE_STEP)
+    
+    def report_block(self, key: str):
+        """Блокировка: скорость падает вдвое, накопленные токены сгорают"""
+        with self._lock:
+            bucket = self._bucket(key)
+            # Прошедшее время засчитывается по прежней скорости
+            bucket._refill(time.monotonic())
+            bucket.rate = max(self.min_rate, bucket.rate * self.DECREASE_FACTOR)
+            bucket.tokens = min(bucket.tokens, 0.0)
+            rate = bucket.rate
+        print(f"🐢 Снижаю частоту запросов для {mask_proxy(key)}: {rate * 60:.1f} в минуту")
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Текущая скорость по выходным IP (запросов в минуту)"""
+        with self._lock:
+            return {mask_proxy(key): round(bucket.rate * 60, 1) for key, bucket in self._buckets.items()}
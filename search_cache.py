@@ -0,0 +1,128 @@
+"""
+Общий кэш результатов поиска с объединением одновременных загрузок (single-flight)
+"""
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, List
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+def canonical_url(url: str) -> str:
+    """
+    Канонический ключ поиска по URL
+    
+    Порядок параметров, регистр и лишние пробелы в запросе не влияют на ключ:
+    "?q=iPhone  13&pmax=5" и "?pmax=5&q=iphone 13" дают одну и ту же выдачу.
+    """
+    parts = urlsplit(url)
+    params = []
+    for key, value in parse_qsl(parts.query):
+        value = ' '.join(value.split()).lower()
+        if value:
+            params.append((key, value))
+    query = urlencode(sorted(params))
+    path = parts.path.lower().rstrip('/')
+    return f"{parts.netloc.lower()}{path}?{query}" if query else f"{parts.netloc.lower()}{path}"
+
+
+class SearchCache:
+    # Сколько секунд загруженная выдача считается свежей
+    TTL_SECONDS = 30
+    
+    def __init__(self, ttl: float = None):
+        """
+        Кэш результатов загрузки и разбора выдачи
+        
+        Если одну и ту же выдачу одновременно запрашивают несколько проверок
+        (автопроверка и /check, одинаковые поиски разных подписчиков), загружает
+        ее только первая, остальные ждут ее результата. Результат живет ttl
+        секунд, неудачные загрузки не кэшируются.
+        
+        Args:
+            ttl: Время жизни результата (сек), 0 - только объединение загрузок
+        """
+        self.ttl = ttl if ttl is not None else self.TTL_SECONDS
+        self._lock = threading.Lock()
+        # Ключ -> (момент устаревания, результат)
+        self._results = {}
+        # Ключ -> загрузка, которую ведет другой поток: [событие окончания, результат]
+        self._inflight = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.loads = 0
+    
+    def _prune(self, now: float):
+        """Удаление устаревших результатов"""
+        expired = [key for key, (expires, _) in self._results.items() if expires <= now]
+        for key in expired:
+            del self._results[key]
+    
+    def get_many(self, keys: Iterable[Hashable], loader: Callable[[List[Hashable]], Dict]) -> Dict:
+        """
+        Результаты для ключей: из кэша, из чужой загрузки или через loader
+        
+        Args:
+            keys: Ключи (например canonical_url)
+            loader: Функция, загружающая список ключей за один раз и
+                возвращающая словарь ключ -> результат (None - ошибка)
+        
+        Returns:
+            Словарь ключ -> результат (None, если загрузка не удалась)
+        """
+        results = {}
+        owned = []
+        waiting = {}
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            for key in dict.fromkeys(keys):
+                if key in self._results:
+                    results[key] = self._results[key][1]
+                    self.hits += 1
+                elif key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                    self.coalesced += 1
+                else:
+                    self._inflight[key] = [threading.Event(), None]
+                    owned.append(key)
+            self.loads += len(owned)
+        
+        if owned:
+            loaded = {}
+            try:
+                loaded = loader(owned) or {}
+            finally:
+                # Ожидающих освобождаем даже при исключении в loader
+                with self._lock:
+                    expires = time.monotonic() + self.ttl
+                    for key in owned:
+                        value = loaded.get(key)
+                        if value is not None and self.ttl > 0:
+                            self._results[key] = (expires, value)
+                        flight = self._inflight.pop(key)
+                        flight[1] = value
+                        flight[0].set()
+            for key in owned:
+                results[key] = loaded.get(key)
+        
+        for key, flight in waiting.items():
+            flight[0].wait()
+            results[key] = flight[1]
+        
+        return results
+    
+    def invalidate(self, keys: Iterable[Hashable]):
+        """Забыть результаты (например, их не удалось сохранить)"""
+        with self._lock:
+            for key in keys:
+                self._results.pop(key, None)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Попадания в кэш, объединенные и выполненные загрузки"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'coalesced': self.coalesced,
+                'loads': self.loads,
+                'cached': len(self._results),
+            }
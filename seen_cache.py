@@ -0,0 +1,112 @@
+"""
+Кэш уже виденных ID объявлений в памяти (Bloom-фильтр + LRU)
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        Bloom-фильтр для строковых ключей
+        
+        Args:
+            capacity: Ожидаемое количество элементов
+            error_rate: Допустимая доля ложноположительных ответов
+        """
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, key: str):
+        """Позиции битов для ключа (двойное хеширование одного дайджеста)"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+    
+    def add(self, key: str):
+        """Добавление ключа"""
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+    
+    def __contains__(self, key: str) -> bool:
+        """False - ключа точно нет, True - ключ вероятно есть"""
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class SeenIdCache:
+    # Минимальная емкость Bloom-фильтра
+    MIN_CAPACITY = 100000
+    # Сколько последних ID держим точно
+    LRU_SIZE = 10000
+    
+    def __init__(self, capacity: int = MIN_CAPACITY, lru_size: int = LRU_SIZE):
+        """
+        Слой перед таблицей found_items
+        
+        Bloom-фильтр отвечает "точно не видели" без обращения к диску,
+        LRU хранит недавние ID и отвечает "точно видели". В базу уходят
+        только вероятные попадания, которых нет в LRU.
+        
+        Args:
+            capacity: Емкость Bloom-фильтра
+            lru_size: Размер LRU недавних ID
+        """
+        self.lru_size = lru_size
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(max(self.MIN_CAPACITY, capacity))
+        self._recent = OrderedDict()
+    
+    def reset(self, ids: Iterable[str] = (), capacity: int = 0):
+        """Пересоздание кэша (прогрев из базы или очистка)"""
+        ids = list(ids)
+        bloom = BloomFilter(max(self.MIN_CAPACITY, capacity, len(ids) * 2))
+        recent = OrderedDict()
+        for item_id in ids:
+            bloom.add(item_id)
+        # Последние по времени ID кладем в LRU
+        for item_id in ids[-self.lru_size:]:
+            recent[item_id] = None
+        
+        with self._lock:
+            self._bloom = bloom
+            self._recent = recent
+    
+    def might_contain(self, item_id: str) -> bool:
+        """False означает, что объявление точно не встречалось"""
+        return item_id in self._bloom
+    
+    def is_recent(self, item_id: str) -> bool:
+        """True означает, что объявление точно встречалось"""
+        with self._lock:
+            if item_id in self._recent:
+                self._recent.move_to_end(item_id)
+                return True
+        return False
+    
+    def add(self, item_id: str):
+        """Отметить ID как виденный"""
+        with self._lock:
+            if item_id not in self._bloom:
+                self._bloom.add(item_id)
+            self._recent[item_id] = None
+            self._recent.move_to_end(item_id)
+            while len(self._recent) > self.lru_size:
+                self._recent.popitem(last=False)
+    
+    @property
+    def overfilled(self) -> bool:
+        """Фильтр заполнен сверх расчетной емкости (растет доля ложных срабатываний)"""
+        return self._bloom.count > self._bloom.capacity
@@ -0,0 +1,96 @@
+"""
+Статистика селекторов: какой селектор срабатывает на каждом типе страницы
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+class SelectorRegistry:
+    # Как часто сохранять накопленную статистику, если победитель не менялся (сек)
+    SAVE_INTERVAL_SECONDS = 600
+    
+    def __init__(self, stats: Dict = None, on_change: Callable[[Dict], None] = None):
+        """
+        Реестр стратегий выбора элементов
+        
+        Для каждого типа страницы запоминается селектор, который сработал
+        последним (победитель). В следующий раз он пробуется первым, а
+        остальные селекторы и дорогие обходы всего дерева - только если
+        победитель перестал находить элементы.
+        
+        Args:
+            stats: Сохраненная статистика (ключ конфигурации selector_stats)
+            on_change: Функция сохранения статистики (вызывается при смене
+                победителя и не чаще SAVE_INTERVAL_SECONDS в остальных случаях)
+        """
+        self._lock = threading.Lock()
+        # Тип страницы -> {'winner': селектор, 'hits': {селектор: число}, 'misses': {...}}
+        self.stats = {}
+        for page_type, entry in (stats or {}).items():
+            if isinstance(entry, dict):
+                self.stats[page_type] = {
+                    'winner': entry.get('winner'),
+                    'hits': dict(entry.get('hits') or {}),
+                    'misses': dict(entry.get('misses') or {}),
+                }
+        self.on_change = on_change
+        self._dirty = False
+        self._saved_at = time.monotonic()
+    
+    def order(self, page_type: str, selectors: Sequence[str]) -> List[str]:
+        """Селекторы в порядке проверки: победитель первым, остальные как заданы"""
+        with self._lock:
+            winner = self.stats.get(page_type, {}).get('winner')
+        if winner in selectors:
+            return [winner] + [selector for selector in selectors if selector != winner]
+        return list(selectors)
+    
+    def record(self, page_type: str, selector: Optional[str], tried: Sequence[str] = ()):
+        """
+        Результат поиска элементов
+        
+        Args:
+            page_type: Тип страницы (например 'search_items')
+            selector: Сработавший селектор (None - не сработал ни один)
+            tried: Селекторы, которые проверялись до него и ничего не нашли
+        """
+        with self._lock:
+            entry = self.stats.setdefault(page_type, {'winner': None, 'hits': {}, 'misses': {}})
+            for missed in tried:
+                entry['misses'][missed] = entry['misses'].get(missed, 0) + 1
+            changed = False
+            if selector is not None:
+                entry['hits'][selector] = entry['hits'].get(selector, 0) + 1
+                if entry['winner'] != selector:
+                    if entry['winner'] is not None:
+                        print(f"🔀 {page_type}: селектор {entry['winner']} больше не срабатывает, теперь {selector}")
+                    entry['winner'] = selector
+                    changed = True
+            self._dirty = True
+            due = changed or time.monotonic() - self._saved_at >= self.SAVE_INTERVAL_SECONDS
+        if due:
+            self.save()
+    
+    def to_dict(self) -> Dict:
+        """Статистика для сохранения в конфигурации"""
+        with self._lock:
+            return {
+                page_type: {
+                    'winner': entry['winner'],
+                    'hits': dict(entry['hits']),
+                    'misses': dict(entry['misses']),
+                }
+                for page_type, entry in self.stats.items()
+            }
+    
+    def save(self):
+        """Сохранение статистики, если она менялась"""
+        if not self._dirty or self.on_change is None:
+            return
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        try:
+            self.on_change(self.to_dict())
+        except Exception as e:
+            print(f"⚠️ Не удалось сохранить статистику селекторов: {e}")
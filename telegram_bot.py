@@ -4,7 +4,6 @@ Telegram бот для управления парсером Авито
 import asyncio
 import json
 from datetime import datetime
-from typing import Dict
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -15,6 +14,8 @@ from telegram.ext import (
     ContextTypes
 )
 from avito_parser import AvitoParser
+from async_database import AsyncDatabase
+from item import Item
 import threading
 import time
 from queue import Queue
@@ -31,14 +32,33 @@ checking = False
 check_thread = None
 bot_application = None  # Для доступа к боту из callback
 notification_queue = Queue()  # Очередь для уведомлений
+db_async = None  # Неблокирующий доступ к БД из обработчиков
+parser_lock = asyncio.Lock()  # Создание парсера в get_parser
 
 
-def format_item_message(item: Dict) -> str:
+async def get_parser(notify_callback=None) -> AvitoParser:
+    """Получение парсера (создается один раз в потоке БД, не блокируя event loop)"""
+    global parser
+    # Пока парсер создается, другие обработчики ждут его, а не создают свой
+    async with parser_lock:
+        if parser is None:
+            parser = await db_async.run(
+                AvitoParser,
+                notify_callback=notify_callback,
+                use_db=True,
+                use_browser=True,
+                db=db_async.db
+            )
+    return parser
+
+
+def format_item_message(item: Item) -> str:
     """Форматирование сообщения об объявлении"""
-    title = item.get('title', 'Без названия')
-    price = item.get('price', 'Цена не указана')
-    description = item.get('description', '')
-    link = item.get('link', '')
+    item = Item.from_dict(item)
+    title = item.title or 'Без названия'
+    price = item.price or 'Цена не указана'
+    description = item.description
+    link = item.link
     
     message = f"🆕 <b>НОВОЕ ОБЪЯВЛЕНИЕ!</b>\n\n"
     message += f"📦 <b>{title}</b>\n\n"
@@ -160,8 +180,7 @@ async def interval_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Сохраняем конфигурацию
     global parser
-    if parser is None:
-        parser = AvitoParser(notify_callback=send_notification_sync, use_db=True, use_browser=True)
+    parser = await get_parser(notify_callback=send_notification_sync)
     
     # Обновляем конфигурацию
     parser.config['search_params'] = {
@@ -173,7 +192,7 @@ async def interval_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
         'sort': 'date'
     }
     parser.config['check_interval_minutes'] = interval
-    parser.save_config()  # Сохранит в БД если use_db=True
+    await db_async.run(parser.save_config)  # Сохранит в БД если use_db=True
     
     # Сохраняем chat_id для уведомлений
     context.bot_data['chat_id'] = update.effective_chat.id
@@ -243,14 +262,13 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать текущие настройки"""
     global parser
-    if parser is None:
-        parser = AvitoParser(use_db=True, use_browser=True)
+    parser = await get_parser()
     
     config = parser.config
     params = config.get('search_params', {})
     
     # Получаем статистику из БД
-    stats = parser.get_stats()
+    stats = await db_async.get_stats()
     
     status_text = f"""
 📊 <b>Текущие настройки:</b>
@@ -278,13 +296,14 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def check_now(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Проверить объявления прямо сейчас"""
     global parser
-    if parser is None:
-        parser = AvitoParser(notify_callback=send_notification_sync, use_db=True, use_browser=True)
+    parser = await get_parser(notify_callback=send_notification_sync)
     
     await update.message.reply_text("🔍 Проверяю объявления...")
     
     try:
-        new_items = parser.check_new_items()
+        # Проверка долгая (браузер, сеть, БД) - выполняем вне event loop
+        loop = asyncio.get_running_loop()
+        new_items = await loop.run_in_executor(None, parser.check_new_items)
         if new_items:
             await update.message.reply_text(
                 f"✅ Найдено новых объявлений: {len(new_items)}"
@@ -327,7 +346,8 @@ async def process_notifications(context: ContextTypes.DEFAULT_TYPE):
             if bot_application is None:
                 continue
             
-            chat_id = bot_application.bot_data.get('chat_id')
+            # Объявление по поиску подписчика уходит ему, остальные - в чат бота
+            chat_id = item.get('subscriber') or bot_application.bot_data.get('chat_id')
             if not chat_id:
                 continue
             
@@ -356,8 +376,7 @@ async def start_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Проверка уже запущена!")
         return
     
-    if parser is None:
-        parser = AvitoParser(notify_callback=send_notification_sync, use_db=True, use_browser=True)
+    parser = await get_parser(notify_callback=send_notification_sync)
     
     # Проверяем, заданы ли параметры
     params = parser.config.get('search_params', {})
@@ -395,7 +414,7 @@ async def stop_check(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("⏹️ Проверка остановлена")
 
 
-def send_notification_sync(item: Dict):
+def send_notification_sync(item: Item):
     """Синхронная функция для отправки уведомления (вызывается из парсера)"""
     # Просто добавляем в очередь, обработка будет в асинхронном потоке
     global notification_queue
@@ -404,7 +423,7 @@ def send_notification_sync(item: Dict):
 
 def main():
     """Главная функция для запуска бота"""
-    global bot_application
+    global bot_application, db_async
     
     # Используем захардкоженный токен
     token = TELEGRAM_BOT_TOKEN
@@ -413,6 +432,9 @@ def main():
         print("❌ Ошибка: Токен бота не задан!")
         return
     
+    # База данных с отдельным потоком для запросов из обработчиков
+    db_async = AsyncDatabase()
+    
     # Создаем приложение
     print("🔧 Создаю приложение...")
     try:
@@ -2,16 +2,18 @@
 Telegram бот для управления парсером Авито на Aiogram
 """
 import asyncio
+import html
 import json
 from datetime import datetime
-from typing import Dict
 from aiogram import Bot, Dispatcher, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.storage.memory import MemoryStorage
 from avito_parser import AvitoParser
+from async_database import AsyncDatabase
+from item import Item
 import threading
 import time
 from queue import Queue
@@ -36,14 +38,33 @@ check_thread = None
 notification_queue = Queue()
 bot_instance = None
 chat_id_storage = None
+db_async = None  # Неблокирующий доступ к БД из обработчиков
+parser_lock = asyncio.Lock()  # Создание парсера в get_parser
 
 
-def format_item_message(item: Dict) -> str:
+async def get_parser(notify_callback=None) -> AvitoParser:
+    """Получение парсера (создается один раз в потоке БД, не блокируя event loop)"""
+    global parser
+    # Пока парсер создается, другие обработчики ждут его, а не создают свой
+    async with parser_lock:
+        if parser is None:
+            parser = await db_async.run(
+                AvitoParser,
+                notify_callback=notify_callback,
+                use_db=True,
+                use_browser=True,
+                db=db_async.db
+            )
+    return parser
+
+
+def format_item_message(item: Item) -> str:
     """Форматирование сообщения об объявлении"""
-    title = item.get('title', 'Без названия')
-    price = item.get('price', 'Цена не указана')
-    description = item.get('description', '')
-    link = item.get('link', '')
+    item = Item.from_dict(item)
+    title = item.title or 'Без названия'
+    price = item.price or 'Цена не указана'
+    description = item.description
+    link = item.link
     
     message = f"🆕 <b>НОВОЕ ОБЪЯВЛЕНИЕ!</b>\n\n"
     message += f"📦 <b>{title}</b>\n\n"
@@ -72,6 +93,7 @@ async def start_handler(message: Message):
 /start_check - Начать проверку объявлений
 /stop_check - Остановить проверку
 /check_now - Проверить объявления прямо сейчас
+/find <текст> - Найти среди сохраненных объявлений
 
 Используй /setup чтобы задать параметры поиска!
 """
@@ -99,8 +121,7 @@ async def query_input(message: Message, state: FSMContext):
     # Сохраняем конфигурацию сразу
     global parser, chat_id_storage
     
-    if parser is None:
-        parser = AvitoParser(notify_callback=send_notification_sync, use_db=True, use_browser=True)
+    parser = await get_parser(notify_callback=send_notification_sync)
     
     # Обновляем конфигурацию - только название товара
     parser.config['search_params'] = {
@@ -108,7 +129,7 @@ async def query_input(message: Message, state: FSMContext):
         'sort': 'date'
     }
     parser.config['check_interval_minutes'] = interval
-    parser.save_config()
+    await db_async.run(parser.save_config)
     
     # Сохраняем chat_id для уведомлений
     chat_id_storage = message.chat.id
@@ -266,14 +287,13 @@ async def query_input(message: Message, state: FSMContext):
 async def status_handler(message: Message):
     """Показать текущие настройки"""
     global parser
-    if parser is None:
-        parser = AvitoParser(use_db=True, use_browser=True)
+    parser = await get_parser()
     
     config = parser.config
     params = config.get('search_params', {})
     
     # Получаем статистику из БД
-    stats = parser.get_stats()
+    stats = await db_async.get_stats()
     
     status_text = f"""
 📊 <b>Текущие настройки:</b>
@@ -295,12 +315,38 @@ async def status_handler(message: Message):
     await message.answer(status_text, parse_mode='HTML')
 
 
+async def find_handler(message: Message, command: CommandObject):
+    """Поиск по сохраненным объявлениям: /find <текст>"""
+    query = (command.args or '').strip()
+    if not query:
+        await message.answer(
+            "Использование: /find <текст>\n"
+            "Например: /find iphone 13"
+        )
+        return
+    
+    items = await db_async.search_items(query, limit=10)
+    if not items:
+        await message.answer(f"🔍 По запросу «{html.escape(query)}» ничего не найдено", parse_mode='HTML')
+        return
+    
+    lines = [f"🔍 <b>Найдено по запросу «{html.escape(query)}»:</b>"]
+    for item in items:
+        title = html.escape(item.title or 'Без названия')
+        price = html.escape(item.price or 'Цена не указана')
+        found_at = item.found_at[:16].replace('T', ' ')
+        link = item.link
+        line = f"📦 <a href='{html.escape(link)}'>{title}</a>" if link else f"📦 {title}"
+        lines.append(f"{line}\n💰 {price} · 🕐 {found_at}")
+    
+    await message.answer('\n\n'.join(lines), parse_mode='HTML', disable_web_page_preview=True)
+
+
 async def check_now_handler(message: Message):
     """Проверить объявления прямо сейчас"""
     global parser, chat_id_storage, bot_instance
-    if parser is None:
-        # Создаем парсер БЕЗ callback, отправляем вручную
-        parser = AvitoParser(notify_callback=None, use_db=True, use_browser=True)
+    # Создаем парсер БЕЗ callback, отправляем вручную
+    parser = await get_parser(notify_callback=None)
     
     chat_id_storage = message.chat.id
     bot_instance = message.bot  # Сохраняем бота для использования
@@ -309,10 +355,15 @@ async def check_now_handler(message: Message):
     print(f"📱 Chat ID установлен: {chat_id_storage}")
     
     try:
-        new_items = parser.check_new_items()
+        # Проверка долгая (браузер, сеть, БД) - выполняем вне event loop
+        loop = asyncio.get_running_loop()
+        new_items = await loop.run_in_executor(None, parser.check_new_items)
         print(f"📦 Получено объявлений из парсера: {len(new_items) if new_items else 0}")
         
-        if new_items:
+        if new_items and parser.notify_callback:
+            # Парсер, созданный автопроверкой, уже отправил объявления через callback
+            await message.answer(f"✅ Найдено объявлений: {len(new_items)}")
+        elif new_items:
             # Отправляем найденные объявления сразу в Telegram
             for item in new_items:
                 try:
@@ -366,9 +417,8 @@ async def start_check_handler(message: Message):
         await message.answer("⚠️ Проверка уже запущена!")
         return
     
-    if parser is None:
-        # Для автопроверки используем callback через очередь
-        parser = AvitoParser(notify_callback=send_notification_sync, use_db=True, use_browser=True)
+    # Для автопроверки используем callback через очередь
+    parser = await get_parser(notify_callback=send_notification_sync)
     
     # Сохраняем бота и chat_id для уведомлений
     bot_instance = message.bot
@@ -410,7 +460,7 @@ async def stop_check_handler(message: Message):
     await message.answer("⏹️ Проверка остановлена")
 
 
-def send_notification_sync(item: Dict):
+def send_notification_sync(item: Item):
     """Синхронная функция для отправки уведомления (вызывается из парсера)"""
     # Просто добавляем в очередь, обработка будет в асинхронном потоке
     global notification_queue
@@ -439,16 +489,18 @@ async def process_notifications():
                 print("⚠️ bot_instance is None, пропускаю уведомление")
                 continue
                 
-            if chat_id_storage is None:
+            # Объявление по поиску подписчика уходит ему, остальные - в чат бота
+            chat_id = item.get('subscriber') or chat_id_storage
+            if chat_id is None:
                 print("⚠️ chat_id_storage is None, пропускаю уведомление")
                 continue
             
             message = format_item_message(item)
             
             try:
-                print(f"📤 Отправляю сообщение в Telegram (chat_id: {chat_id_storage})...")
+                print(f"📤 Отправляю сообщение в Telegram (chat_id: {chat_id})...")
                 await bot_instance.send_message(
-                    chat_id=chat_id_storage,
+                    chat_id=chat_id,
                     text=message,
                     parse_mode='HTML',
                     disable_web_page_preview=False
@@ -468,7 +520,7 @@ async def process_notifications():
 
 async def main():
     """Главная функция для запуска бота"""
-    global bot_instance
+    global bot_instance, db_async
     
     # Используем захардкоженный токен
     token = TELEGRAM_BOT_TOKEN
@@ -482,6 +534,10 @@ async def main():
     print(f"🔑 Токен бота: {token[:20]}...")
     print("🚀 Запускаю бота...")
     
+    # База данных с отдельным потоком для запросов из обработчиков
+    # (миграции при открытии не должны блокировать event loop)
+    db_async = await asyncio.get_running_loop().run_in_executor(None, AsyncDatabase)
+    
     # Создаем бота (стандартный способ)
     bot = Bot(token=token)
     bot_instance = bot
@@ -494,6 +550,7 @@ async def main():
     dp.message.register(setup_handler, Command('setup'))
     dp.message.register(status_handler, Command('status'))
     dp.message.register(check_now_handler, Command('check_now'))
+    dp.message.register(find_handler, Command('find'))
     dp.message.register(start_check_handler, Command('start_check'))
     dp.message.register(stop_check_handler, Command('stop_check'))
     
@@ -562,6 +619,10 @@ async def main():
             await dp.storage.close()
         except:
             pass
+        try:
+            await db_async.close()
+        except:
+            pass
 
 
 if __name__ == '__main__':
@@ -0,0 +1,69 @@
+"""
+Тест разбора до водяного знака на странице, где JSON описывает не всю выдачу
+
+Запуск: python -m pytest test_watermark.py (или python test_watermark.py)
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+from avito_parser import AvitoParser
+from json_state import extract_items
+from watermark import Watermark
+
+
+def make_page(card_ids, offer_ids) -> str:
+    """Страница с карточками card_ids и ld+json, в котором есть только offer_ids"""
+    offers = [{'url': f'https://www.avito.ru/moskva/odezhda/kurtka_{item_id}', 'name': f'Куртка {item_id}',
+               'price': 1000} for item_id in offer_ids]
+    ld = json.dumps({'@type': 'Product', 'offers': {'@type': 'AggregateOffer', 'offers': offers}})
+    cards = ''.join(
+        f'<div data-marker="item" data-item-id="{item_id}">'
+        f'<a href="/moskva/odezhda/kurtka_{item_id}" class="title">Куртка {item_id}</a></div>'
+        for item_id in card_ids
+    )
+    return (f'<html><head><script type="application/ld+json">{ld}</script></head>'
+            f'<body><div data-marker="catalog-serp">{cards}</div></body></html>')
+
+
+def make_parser() -> AvitoParser:
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = AvitoParser(config_path=os.path.join(tempfile.mkdtemp(), 'config.json'),
+                             use_db=False, use_browser=False, backend='requests')
+    parser.selectors.on_change = None
+    return parser
+
+
+# Прошлая проверка видела верх выдачи 1001, 1000, 999. Теперь над 1000 появились
+# новые 1010 и 1009, а закрепленное 1001 осталось первым
+CARDS = [1001, 1010, 1009, 1000, 999]
+SEEN = [1001, 1000, 999]
+
+
+def test_partial_ld_json_is_not_used():
+    """ld+json без части карточек (пропуск в середине выдачи) не заменяет DOM"""
+    assert extract_items(make_page(CARDS, SEEN)) is None
+
+
+def test_ld_json_follows_card_order():
+    """Полный ld+json в другом порядке возвращается в порядке карточек"""
+    items = extract_items(make_page(CARDS, sorted(CARDS)))
+    assert [item.id for item in items] == CARDS
+
+
+def test_watermark_keeps_new_items_in_gap():
+    """Новые объявления между виденными не отрезаются водяным знаком"""
+    parser = make_parser()
+    watermark = Watermark(SEEN)
+    with contextlib.redirect_stdout(io.StringIO()):
+        items = parser.parse_html(make_page(CARDS, SEEN), watermark=watermark)
+    assert [item.id for item in items] == [1010, 1009]
+    assert watermark.reached
+
+
+if __name__ == '__main__':
+    for test in (test_partial_ld_json_is_not_used, test_ld_json_follows_card_order,
+                 test_watermark_keeps_new_items_in_gap):
+        test()
+        print(f"✅ {test.__name__}")
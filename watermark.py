@@ -0,0 +1,62 @@
+"""
+Водяной знак выдачи: ID объявлений с верха страницы на прошлой проверке
+"""
+from typing import Iterable, List, Sequence, Tuple
+
+
+class Watermark:
+    # Сколько ID с верха выдачи запоминать
+    SIZE = 10
+    # Сколько виденных объявлений подряд останавливают разбор: одно старое
+    # объявление (поднятое или закрепленное) над новыми не должно их скрыть
+    RUN = 2
+    
+    def __init__(self, ids: Sequence = ()):
+        """
+        Граница уже виденного в выдаче одного поиска
+        
+        Выдача отсортирована от новых к старым, поэтому все, что ниже
+        объявлений с прошлой проверки, уже виденное. Разбор страницы идет
+        по порядку: у каждого объявления сначала берется только ID, виденные
+        пропускаются без разбора полей, а после RUN виденных подряд разбор
+        останавливается.
+        
+        Экземпляр создается на один разбор страницы и считает совпадения.
+        
+        Args:
+            ids: ID с верха выдачи на прошлой проверке (сначала новые)
+        """
+        self.ids = tuple(str(item_id) for item_id in ids)
+        self._known = frozenset(self.ids)
+        self._run = 0
+        # Встречено виденных объявлений
+        self.matched = 0
+        # Разбор остановлен на виденных
+        self.reached = False
+    
+    def is_known(self, item_id) -> bool:
+        """Объявление уже видели (заодно отмечает, не пора ли остановиться)"""
+        if str(item_id) not in self._known:
+            self._run = 0
+            return False
+        self.matched += 1
+        self._run += 1
+        if self._run >= self.RUN:
+            self.reached = True
+        return True
+    
+    def cut(self, items: Iterable) -> List:
+        """Новые объявления из готового списка (JSON страницы или API)"""
+        new_items = []
+        for item in items:
+            if self.is_known(item.id):
+                if self.reached:
+                    break
+                continue
+            new_items.append(item)
+        return new_items
+    
+    def advance(self, items: Iterable) -> Tuple[str, ...]:
+        """ID верха выдачи для следующей проверки: новые объявления над прежними"""
+        ids = [str(item.id) for item in items] + list(self.ids)
+        return tuple(dict.fromkeys(ids))[:self.SIZE]